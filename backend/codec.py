@@ -0,0 +1,57 @@
+# Dbanyan Group Backend - Document Codec
+# Single mapping between Pydantic models and MongoDB documents
+# Money is stored as Decimal128 and timestamps as BSON dates so that
+# server-side aggregation and range queries work on native types.
+# UUIDs are passed through untouched: the client's uuidRepresentation
+# stores them as BSON Binary and returns uuid.UUID on read
+
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Type, TypeVar
+
+from bson.decimal128 import Decimal128
+from pydantic import BaseModel
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def encode_value(value: Any) -> Any:
+    """Convert Python values to BSON-native types (for documents, filters and $set payloads)"""
+    if isinstance(value, BaseModel):
+        return encode_value(value.model_dump())
+    if isinstance(value, Decimal):
+        return Decimal128(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [encode_value(item) for item in value]
+    return value
+
+
+def decode_value(value: Any) -> Any:
+    """Convert BSON-native types back to the Python types the models expect"""
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    if isinstance(value, dict):
+        return {key: decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    return value
+
+
+def to_document(model: BaseModel, **dump_kwargs) -> Dict[str, Any]:
+    """Serialize a model for insert/replace"""
+    return encode_value(model.model_dump(**dump_kwargs))
+
+
+def from_document(model_cls: Type[ModelT], doc: Dict[str, Any]) -> ModelT:
+    """Build a model from a stored document (Mongo's _id is dropped)"""
+    decoded = decode_value({key: value for key, value in doc.items() if key != "_id"})
+    return model_cls(**decoded)
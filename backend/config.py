@@ -18,6 +18,68 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URI: str
     DB_NAME: str = "dbanyan"
+    # "standard" stores uuid.UUID as BSON Binary subtype 4; legacy modes use subtype 3
+    MONGODB_UUID_REPRESENTATION: str = "standard"
+    
+    # Order numbers are leased from the counters collection in blocks of this size
+    ORDER_NUMBER_BLOCK_SIZE: int = 100
+    
+    # Order archival (terminal orders older than this move to orders_archive)
+    ORDER_ARCHIVE_AFTER_DAYS: int = 180
+    ORDER_ARCHIVE_BATCH_SIZE: int = 1000
+    
+    # Pending-order expiry sweeper (unpaid Razorpay orders)
+    PENDING_ORDER_EXPIRY_MINUTES: int = 60
+    PENDING_ORDER_SWEEP_BATCH_SIZE: int = 500
+    PENDING_ORDER_SWEEP_INTERVAL_SECONDS: int = 300  # 0 disables the in-process sweeper
+    
+    # Live order events (SSE)
+    ORDER_EVENTS_HEARTBEAT_SECONDS: int = 15
+    ORDER_EVENTS_RETRY_MS: int = 3000
+    
+    # Checkout admission control (per worker process)
+    CHECKOUT_MAX_CONCURRENCY: int = 32
+    CHECKOUT_MAX_QUEUE: int = 500
+    CHECKOUT_MAX_WAIT_SECONDS: float = 10.0
+    CHECKOUT_SKU_MAX_CONCURRENCY: int = 8  # 0 disables per-SKU gating
+    CHECKOUT_TOKEN_TTL_SECONDS: int = 600
+    
+    # Sales analytics cubes (rebuilt by jobs.build_analytics)
+    ANALYTICS_DATA_DIR: str = "data/analytics"
+    
+    # Invoices (rendered in a process pool, cached on local disk)
+    INVOICE_CACHE_DIR: str = "data/invoices"
+    INVOICE_RENDER_WORKERS: int = 2
+    INVOICE_SELLER_NAME: str = "Dbanyan Group"
+    INVOICE_SELLER_ADDRESS: str = ""
+    INVOICE_SELLER_GSTIN: str = ""
+    
+    # Coupon cache (per worker process)
+    COUPON_CACHE_TTL_SECONDS: int = 60
+    COUPON_NEGATIVE_CACHE_TTL_SECONDS: int = 30
+    COUPON_CACHE_MAX_ENTRIES: int = 10000
+    COUPON_BULK_CHUNK_SIZE: int = 5000  # codes per insert_many / CSV chunk
+    
+    # Coupon guessing guard (Bloom filter of codes + per-client throttling)
+    COUPON_BLOOM_CAPACITY: int = 2_000_000
+    COUPON_BLOOM_ERROR_RATE: float = 0.001
+    COUPON_BLOOM_REFRESH_SECONDS: int = 30
+    COUPON_GUESS_FREE_ATTEMPTS: int = 5
+    COUPON_GUESS_BASE_DELAY_SECONDS: float = 0.25
+    COUPON_GUESS_BLOCK_DELAY_SECONDS: float = 8.0  # delays at or past this become 429s
+    COUPON_GUESS_WINDOW_SECONDS: int = 900
+    TRUSTED_PROXY_HOPS: int = 0  # reverse proxies appending to X-Forwarded-For (0: use the socket peer)
+    
+    # Promotion engine (compiled rules are reloaded at most this often per worker)
+    PROMOTIONS_REFRESH_SECONDS: int = 60
+    
+    # Newsletter
+    SUBSCRIBER_IMPORT_BATCH_SIZE: int = 1000  # upserts per bulk_write
+    SUBSCRIBER_PAGE_SIZE: int = 1000  # keyset page size when iterating subscribers
+    CAMPAIGN_SMTP_POOL_SIZE: int = 4  # persistent SMTP connections per campaign send
+    CAMPAIGN_RATE_PER_SECOND: float = 10.0  # token-bucket send rate (0: unlimited)
+    CAMPAIGN_RATE_BURST: int = 20
+    CAMPAIGN_LEASE_SECONDS: int = 300  # a crashed sender's campaign can be resumed after this
     
     # Security
     JWT_SECRET_KEY: str
@@ -41,6 +103,7 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_USERNAME: str = ""
     SMTP_PASSWORD: str = ""
+    SMTP_USE_TLS: bool = True  # STARTTLS; disable for a local sink (python -m aiosmtpd -n -l localhost:1025)
     FROM_EMAIL: str = ""
     FROM_NAME: str = ""
     FRONTEND_URL: str = ""
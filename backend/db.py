@@ -1,9 +1,11 @@
 # Dbanyan Group Backend - Database Connection
 # Following project_context.md Section 3.1: MongoDB with Motor (async)
 # CRITICAL: Using UUID instead of ObjectId as per requirements
+# UUIDs are stored as BSON Binary (see MONGODB_UUID_REPRESENTATION)
 
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
 from config import settings
 
 # Database connection
@@ -12,12 +14,21 @@ database: AsyncIOMotorDatabase = None
 
 logger = logging.getLogger(__name__)
 
+PENDING_ONLINE_ORDERS_INDEX = "pending_online_orders"
+
+# Case-insensitive email matching for subscribers (queries must pass the same collation)
+EMAIL_COLLATION = {"locale": "en", "strength": 2}
+SUBSCRIBER_EMAIL_INDEX = "email_ci"
+
 
 async def connect_to_mongo():
     """Create database connection on startup"""
     global client, database
     try:
-        client = AsyncIOMotorClient(settings.MONGODB_URI)
+        client = AsyncIOMotorClient(
+            settings.MONGODB_URI,
+            uuidRepresentation=settings.MONGODB_UUID_REPRESENTATION
+        )
         database = client[settings.DB_NAME]
         
         # Test connection
@@ -53,6 +64,22 @@ async def get_database() -> AsyncIOMotorDatabase:
     return database
 
 
+async def create_subscriber_email_index(database: AsyncIOMotorDatabase):
+    """Unique case-insensitive email index, replacing the legacy case-sensitive one"""
+    try:
+        await database.subscribers.create_index(
+            "email", unique=True, name=SUBSCRIBER_EMAIL_INDEX, collation=EMAIL_COLLATION
+        )
+    except OperationFailure as e:
+        # Legacy rows differing only by case block the unique index; keep the old one
+        logger.error(f"Could not create {SUBSCRIBER_EMAIL_INDEX} index (case-duplicate emails?): {e}")
+        return
+    
+    indexes = await database.subscribers.index_information()
+    if "email_1" in indexes:
+        await database.subscribers.drop_index("email_1")
+
+
 async def create_indexes():
     """Create database indexes for optimal query performance"""
     try:
@@ -64,23 +91,78 @@ async def create_indexes():
         
         # Orders collection indexes
         await database.orders.create_index("uid", unique=True)
-        await database.orders.create_index("customer_email")
-        await database.orders.create_index("status")
-        await database.orders.create_index("created_at")
+        await database.orders.create_index([("customer_email", 1), ("created_at", -1), ("uid", -1)])
+        # Compound (filter, created_at, uid) indexes serve admin keyset pages without in-memory sorts
+        await database.orders.create_index([("created_at", -1), ("uid", -1)])
+        await database.orders.create_index([("status", 1), ("created_at", -1), ("uid", -1)])
+        await database.orders.create_index([("payment_status", 1), ("created_at", -1), ("uid", -1)])
         await database.orders.create_index("razorpay_order_id")
+        await database.orders.create_index("late_payment_id", sparse=True)  # payments awaiting refund
+        await database.orders.create_index(
+            "order_number",
+            unique=True,
+            partialFilterExpression={"order_number": {"$type": "string"}}
+        )
+        # Only unpaid online orders - keeps the expiry sweeper's index tiny
+        await database.orders.create_index(
+            [("payment_status", 1), ("created_at", 1)],
+            name=PENDING_ONLINE_ORDERS_INDEX,
+            partialFilterExpression={
+                "payment_status": "pending",
+                "razorpay_order_id": {"$type": "string"}
+            }
+        )
+        # A Razorpay payment can settle at most one order; partial so unpaid orders (null) don't collide
+        await database.orders.create_index(
+            "razorpay_payment_id",
+            unique=True,
+            partialFilterExpression={"razorpay_payment_id": {"$type": "string"}}
+        )
+        
+        # Archived (terminal, aged-out) orders - same uid lookup semantics as orders
+        await database.orders_archive.create_index("uid", unique=True)
+        await database.orders_archive.create_index(
+            "order_number",
+            unique=True,
+            partialFilterExpression={"order_number": {"$type": "string"}}
+        )
+        await database.orders_archive.create_index([("customer_email", 1), ("created_at", -1), ("uid", -1)])
+        await database.orders_archive.create_index([("created_at", -1), ("uid", -1)])  # exports
         
         # Users collection indexes (for future admin functionality)
         await database.users.create_index("uid", unique=True)
         await database.users.create_index("email", unique=True)
         
         # Newsletter subscribers
-        await database.subscribers.create_index("email", unique=True)
+        await create_subscriber_email_index(database)
         await database.subscribers.create_index("created_at")
+        await database.subscribers.create_index([("is_active", 1), ("_id", 1)])  # keyset paging
+        
+        # Newsletter campaigns and their per-recipient delivery checkpoints
+        await database.newsletter_campaigns.create_index("uid", unique=True)
+        await database.campaign_deliveries.create_index([("campaign_uid", 1), ("email", 1)], unique=True)
+        await database.campaign_deliveries.create_index([("campaign_uid", 1), ("status", 1)])
         
         # Coupons collection
         await database.coupons.create_index("code", unique=True)
         await database.coupons.create_index("is_active")
         await database.coupons.create_index("expires_at")
+        await database.coupons.create_index("created_at")  # Bloom filter top-ups
+        
+        await database.coupons.create_index("campaign_id", sparse=True)
+        await database.coupon_campaigns.create_index("uid", unique=True)
+        
+        # Promotions collection
+        await database.promotions.create_index("uid", unique=True)
+        await database.promotions.create_index("is_active")
+        
+        # Per-customer redemption ledger (one entry per coupon and customer)
+        await database.coupon_redemptions.create_index(
+            [("coupon_uid", 1), ("customer_email", 1)], unique=True
+        )
+        
+        # Sharded redemption counters for hot coupons (_id is "<coupon uid>:<shard>")
+        await database.coupon_counters.create_index("coupon_uid")
         
         logger.info("Database indexes created successfully")
         
@@ -109,3 +191,35 @@ class Collections:
     @staticmethod
     def coupons():
         return database.coupons
+    
+    @staticmethod
+    def coupon_campaigns():
+        return database.coupon_campaigns
+    
+    @staticmethod
+    def newsletter_campaigns():
+        return database.newsletter_campaigns
+    
+    @staticmethod
+    def campaign_deliveries():
+        return database.campaign_deliveries
+    
+    @staticmethod
+    def promotions():
+        return database.promotions
+    
+    @staticmethod
+    def coupon_redemptions():
+        return database.coupon_redemptions
+    
+    @staticmethod
+    def coupon_counters():
+        return database.coupon_counters
+    
+    @staticmethod
+    def orders_archive():
+        return database.orders_archive
+    
+    @staticmethod
+    def order_stats_daily():
+        return database.order_stats_daily
@@ -0,0 +1,3 @@
+# Dbanyan Group Backend - Maintenance Jobs
+# One-off and scheduled jobs, run from the backend directory:
+#   python -m jobs.<job_name>
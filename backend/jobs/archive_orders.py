@@ -0,0 +1,28 @@
+# Dbanyan Group Backend - Order Archival
+# Moves delivered/cancelled/refunded orders older than ORDER_ARCHIVE_AFTER_DAYS
+# from orders into orders_archive, keeping the live working set small
+# Usage: python -m jobs.archive_orders [--older-than-days N] [--batch-size N]
+
+import argparse
+import asyncio
+
+import db
+from services.order_service import OrderService
+
+
+async def archive_orders(older_than_days: int = None, batch_size: int = None):
+    """Run one archival pass"""
+    await db.connect_to_mongo()
+    try:
+        archived = await OrderService(db.database).archive_orders(older_than_days, batch_size)
+        print(f"✅ Archived {archived} orders")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive aged-out terminal orders")
+    parser.add_argument("--older-than-days", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(archive_orders(args.older_than_days, args.batch_size))
@@ -0,0 +1,23 @@
+# Dbanyan Group Backend - Build Sales Analytics Cubes
+# Aggregates paid orders into the compressed cube file read by /analytics
+# Usage: python -m jobs.build_analytics (schedule nightly, e.g. via cron)
+
+import asyncio
+
+import db
+from services.analytics_service import sales_analytics
+
+
+async def build_analytics():
+    """Recompute and persist the sales cubes"""
+    await db.connect_to_mongo()
+    try:
+        result = await sales_analytics.rebuild(db.database)
+        print(f"✅ Built sales analytics: {result['days']} days, "
+              f"{result['products']} products, {result['states']} states")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(build_analytics())
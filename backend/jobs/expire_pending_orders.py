@@ -0,0 +1,28 @@
+# Dbanyan Group Backend - Pending Order Expiry
+# Marks unpaid online orders older than PENDING_ORDER_EXPIRY_MINUTES as expired
+# (the API also runs this sweep in-process every PENDING_ORDER_SWEEP_INTERVAL_SECONDS)
+# Usage: python -m jobs.expire_pending_orders [--older-than-minutes N] [--batch-size N]
+
+import argparse
+import asyncio
+
+import db
+from services.order_service import OrderService
+
+
+async def expire_pending_orders(older_than_minutes: int = None, batch_size: int = None):
+    """Run one expiry sweep"""
+    await db.connect_to_mongo()
+    try:
+        expired = await OrderService(db.database).expire_pending_orders(older_than_minutes, batch_size)
+        print(f"✅ Expired {expired} unpaid orders")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expire stale unpaid online orders")
+    parser.add_argument("--older-than-minutes", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(expire_pending_orders(args.older_than_minutes, args.batch_size))
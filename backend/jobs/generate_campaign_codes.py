@@ -0,0 +1,30 @@
+# Dbanyan Group Backend - Coupon Campaign Code Generation
+# Generates (or resumes generating) a campaign's codes outside the API process
+# Usage: python -m jobs.generate_campaign_codes <campaign uid>
+
+import argparse
+import asyncio
+from uuid import UUID
+
+import db
+from services.coupon_service import CouponService
+
+
+async def generate_campaign_codes(campaign_uid: UUID):
+    """Insert the campaign's remaining codes"""
+    await db.connect_to_mongo()
+    try:
+        result = await CouponService(db.database).generate_campaign_codes(campaign_uid)
+        if not result["success"]:
+            print(f"❌ {result['message']} (re-run to resume)")
+            return
+        print(f"✅ {result['message']}: {result['generated']} codes")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a coupon campaign's codes")
+    parser.add_argument("campaign_uid", type=UUID)
+    args = parser.parse_args()
+    asyncio.run(generate_campaign_codes(args.campaign_uid))
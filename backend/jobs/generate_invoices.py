@@ -0,0 +1,30 @@
+# Dbanyan Group Backend - Month-End Invoice Batch
+# Pre-renders invoice PDFs for every invoiceable order created in a month
+# Usage: python -m jobs.generate_invoices --year 2025 --month 3 [--concurrency N]
+
+import argparse
+import asyncio
+
+import db
+from services.invoice_service import invoice_service
+
+
+async def generate_invoices(year: int, month: int, concurrency: int = None):
+    """Render (or confirm cached) invoices for one month"""
+    await db.connect_to_mongo()
+    try:
+        summary = await invoice_service.generate_month(db.database, year, month, concurrency)
+        print(f"✅ Invoices {year}-{month:02d}: {summary['generated']} generated, "
+              f"{summary['cached']} cached, {summary['failed']} failed")
+    finally:
+        invoice_service.shutdown()
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate month-end invoices")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(generate_invoices(args.year, args.month, args.concurrency))
@@ -0,0 +1,36 @@
+# Dbanyan Group Backend - Newsletter Subscriber Import
+# Bulk-imports a mailing list exported from another tool
+# Usage: python -m jobs.import_subscribers path/to/list.csv
+
+import argparse
+import asyncio
+
+import db
+from services.newsletter_service import NewsletterService
+
+
+async def read_chunks(path: str, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+async def import_subscribers(path: str):
+    """Stream one CSV file into subscribers"""
+    await db.connect_to_mongo()
+    try:
+        summary = await NewsletterService(db.database).import_subscribers(read_chunks(path))
+        print(f"✅ {summary['rows']} rows: {summary['added']} added, {summary['reactivated']} reactivated, "
+              f"{summary['already_active']} already active, {summary['duplicates']} duplicates, "
+              f"{summary['invalid']} invalid, {summary['failed']} failed")
+        for email in summary["invalid_samples"]:
+            print(f"   invalid: {email!r}")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import newsletter subscribers from CSV")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    asyncio.run(import_subscribers(args.path))
@@ -0,0 +1,115 @@
+# Dbanyan Group Backend - BSON Type Migration
+# One-off rewrite of legacy string-encoded money and timestamps
+# (written by model_dump(mode='json')) into Decimal128 and BSON dates
+# Usage: python -m jobs.migrate_bson_types [--batch-size N]
+# Idempotent: documents already holding native types are skipped
+
+import argparse
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from bson.decimal128 import Decimal128
+from pymongo import UpdateOne
+
+import db
+
+# collection -> money fields, date fields, money fields inside each order item
+MIGRATIONS: Dict[str, Dict[str, List[str]]] = {
+    "products": {
+        "money": ["price", "compare_at_price"],
+        "dates": ["created_at", "updated_at"],
+    },
+    "orders": {
+        "money": ["subtotal", "discount_amount", "shipping_cost", "tax_amount", "total_amount"],
+        "dates": ["created_at", "updated_at", "confirmed_at", "shipped_at", "delivered_at"],
+        "item_money": ["unit_price", "total_price"],
+    },
+    "coupons": {
+        "money": ["value", "minimum_order_amount", "maximum_discount_amount"],
+        "dates": ["expires_at", "created_at"],
+    },
+    "users": {
+        "dates": ["created_at", "updated_at", "last_login"],
+    },
+    "subscribers": {
+        "dates": ["created_at"],
+    },
+}
+
+
+def _money(value: Any) -> Any:
+    return Decimal128(Decimal(value)) if isinstance(value, str) else value
+
+
+def _date(value: Any) -> Any:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None) \
+        if isinstance(value, str) else value
+
+
+def _convert(doc: Dict[str, Any], spec: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Build the $set payload for one document"""
+    changes = {}
+    for field in spec.get("money", []):
+        if isinstance(doc.get(field), str):
+            changes[field] = _money(doc[field])
+    for field in spec.get("dates", []):
+        if isinstance(doc.get(field), str):
+            changes[field] = _date(doc[field])
+    item_fields = spec.get("item_money", [])
+    if item_fields and any(
+        isinstance(item.get(field), str) for item in doc.get("items", []) for field in item_fields
+    ):
+        changes["items"] = [
+            {**item, **{field: _money(item.get(field)) for field in item_fields if field in item}}
+            for item in doc["items"]
+        ]
+    return changes
+
+
+async def migrate_collection(name: str, spec: Dict[str, List[str]], batch_size: int) -> int:
+    """Stream legacy documents and rewrite them in unordered batches"""
+    collection = db.database[name]
+    fields = spec.get("money", []) + spec.get("dates", [])
+    legacy_filter = [{field: {"$type": "string"}} for field in fields]
+    legacy_filter += [{f"items.{field}": {"$type": "string"}} for field in spec.get("item_money", [])]
+    projection = fields + (["items"] if spec.get("item_money") else [])
+
+    migrated = 0
+    operations = []
+    cursor = collection.find({"$or": legacy_filter}, projection).batch_size(batch_size)
+    async for doc in cursor:
+        changes = _convert(doc, spec)
+        if changes:
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+    return migrated
+
+
+async def migrate_bson_types(batch_size: int = 1000):
+    """Migrate every collection, then rebuild rollups that depend on native types"""
+    await db.connect_to_mongo()
+    try:
+        for name, spec in MIGRATIONS.items():
+            migrated = await migrate_collection(name, spec, batch_size)
+            print(f"✅ {name}: {migrated} documents migrated")
+
+        from services.order_stats_service import OrderStatsService
+        days = await OrderStatsService(db.database).rebuild()
+        print(f"✅ Rebuilt order stats for {days} days")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate string money/dates to native BSON types")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(migrate_bson_types(args.batch_size))
@@ -0,0 +1,77 @@
+# Dbanyan Group Backend - UUID Binary Migration
+# One-off rewrite of 36-char string uids (and order item product_uids)
+# into BSON Binary UUIDs, per MONGODB_UUID_REPRESENTATION
+# Usage: python -m jobs.migrate_uuid_binary [--batch-size N]
+# Idempotent: documents already holding binary uids are skipped
+
+import argparse
+import asyncio
+from typing import Any, Dict
+from uuid import UUID
+
+from pymongo import UpdateOne
+
+import db
+
+COLLECTIONS = ["products", "orders", "users", "subscribers", "coupons"]
+
+
+def _as_uuid(value: Any) -> Any:
+    return UUID(value) if isinstance(value, str) else value
+
+
+def _convert(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the $set payload for one document"""
+    changes = {}
+    if isinstance(doc.get("uid"), str):
+        changes["uid"] = UUID(doc["uid"])
+    items = doc.get("items")
+    if items and any(isinstance(item.get("product_uid"), str) for item in items):
+        changes["items"] = [
+            {**item, "product_uid": _as_uuid(item.get("product_uid"))} for item in items
+        ]
+    return changes
+
+
+async def migrate_collection(name: str, batch_size: int) -> int:
+    """Stream string-uid documents and rewrite them in unordered batches"""
+    collection = db.database[name]
+    legacy_filter = [{"uid": {"$type": "string"}}]
+    projection = ["uid"]
+    if name == "orders":
+        legacy_filter.append({"items.product_uid": {"$type": "string"}})
+        projection.append("items")
+
+    migrated = 0
+    operations = []
+    cursor = collection.find({"$or": legacy_filter}, projection).batch_size(batch_size)
+    async for doc in cursor:
+        changes = _convert(doc)
+        if changes:
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+    return migrated
+
+
+async def migrate_uuid_binary(batch_size: int = 1000):
+    """Migrate uid fields in every collection"""
+    await db.connect_to_mongo()
+    try:
+        for name in COLLECTIONS:
+            migrated = await migrate_collection(name, batch_size)
+            print(f"✅ {name}: {migrated} documents migrated")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate string uids to BSON Binary UUIDs")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(migrate_uuid_binary(args.batch_size))
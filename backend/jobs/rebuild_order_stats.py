@@ -0,0 +1,22 @@
+# Dbanyan Group Backend - Rebuild Order Stats Rollups
+# Backfills order_stats_daily from the orders collection
+# Usage: python -m jobs.rebuild_order_stats
+
+import asyncio
+
+import db
+from services.order_stats_service import OrderStatsService
+
+
+async def rebuild_order_stats():
+    """Recompute all daily order rollups"""
+    await db.connect_to_mongo()
+    try:
+        days = await OrderStatsService(db.database).rebuild()
+        print(f"✅ Rebuilt order stats for {days} days")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_order_stats())
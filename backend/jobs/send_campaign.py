@@ -0,0 +1,34 @@
+# Dbanyan Group Backend - Newsletter Campaign Send
+# Mails a campaign to every active subscriber; re-running resumes a failed or
+# interrupted send without mailing anyone twice
+# Usage: python -m jobs.send_campaign <campaign uid>
+
+import argparse
+import asyncio
+from uuid import UUID
+
+import db
+from services.campaign_service import CampaignService
+
+
+async def send_campaign(campaign_uid: UUID):
+    """Claim and deliver one campaign"""
+    await db.connect_to_mongo()
+    try:
+        result = await CampaignService(db.database).send_campaign(campaign_uid)
+        if not result["success"]:
+            print(f"❌ {result['message']}")
+            return
+        print(f"✅ {result['sent']} sent, {result['rejected']} rejected, {result['failed']} failed, "
+              f"{result['skipped']} already delivered")
+        if result["failed"]:
+            print("   re-run to retry the failed recipients")
+    finally:
+        await db.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send a newsletter campaign")
+    parser.add_argument("campaign_uid", type=UUID)
+    args = parser.parse_args()
+    asyncio.run(send_campaign(args.campaign_uid))
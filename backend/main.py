@@ -2,6 +2,7 @@
 # Following project_context.md Section 3.1: FastAPI with high performance
 # Optimized for speed and reliability
 
+import asyncio
 import logging
 import uvicorn
 from contextlib import asynccontextmanager
@@ -12,8 +13,12 @@ from fastapi.responses import JSONResponse
 import time
 
 from config import settings
-from db import connect_to_mongo, close_mongo_connection
+from db import connect_to_mongo, close_mongo_connection, get_database
 from routes import api_router
+from services.order_events import order_event_broker
+from services.invoice_service import invoice_service
+from services.coupon_guard import run_coupon_guard_refresher
+from services.order_service import run_pending_order_sweeper
 
 # Configure logging
 logging.basicConfig(
@@ -29,12 +34,23 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Dbanyan Group API...")
     await connect_to_mongo()
+    database = await get_database()
+    order_event_broker.start(database)
+    coupon_guard_task = asyncio.create_task(run_coupon_guard_refresher(database))
+    sweeper_task = None
+    if settings.PENDING_ORDER_SWEEP_INTERVAL_SECONDS:
+        sweeper_task = asyncio.create_task(run_pending_order_sweeper(database))
     logger.info("API startup complete")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Dbanyan Group API...")
+    coupon_guard_task.cancel()
+    if sweeper_task:
+        sweeper_task.cancel()
+    await order_event_broker.stop()
+    invoice_service.shutdown()
     await close_mongo_connection()
     logger.info("API shutdown complete")
 
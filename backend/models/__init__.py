@@ -110,6 +110,7 @@ class PaymentStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     REFUNDED = "refunded"
+    EXPIRED = "expired"  # online payment never completed; swept by the expiry job
 
 
 class OrderItem(BaseModel):
@@ -142,11 +143,19 @@ class OrderCreate(BaseModel):
     notes: Optional[str] = Field(None, max_length=500)
 
 
+class AppliedPromotion(BaseModel):
+    """A promotion's contribution to an order's discount"""
+    uid: UUID
+    name: str
+    discount_amount: Decimal
+
+
 class Order(BaseModel):
     """Complete order schema"""
     model_config = ConfigDict(from_attributes=True)
     
     uid: UUID = Field(default_factory=uuid4)
+    order_number: Optional[str] = None  # human-readable, e.g. DB-000C1SM
     customer_email: EmailStr
     items: List[OrderItem]
     shipping_address: ShippingAddress
@@ -161,22 +170,83 @@ class Order(BaseModel):
     # Payment
     razorpay_order_id: Optional[str] = None
     razorpay_payment_id: Optional[str] = None
+    late_payment_id: Optional[str] = None  # paid after expiry/cancellation: needs refund or review
     payment_status: PaymentStatus = PaymentStatus.PENDING
     
     # Status & Tracking
     status: OrderStatus = OrderStatus.PENDING
     tracking_number: Optional[str] = None
     coupon_code: Optional[str] = None
+    applied_promotions: List[AppliedPromotion] = Field(default_factory=list)
+    coupon_uid: Optional[UUID] = None  # set when a coupon redemption is held by this order
+    coupon_shard: Optional[int] = None  # counter shard holding it (None: the coupon itself)
     notes: Optional[str] = None
     
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     confirmed_at: Optional[datetime] = None
+    expired_at: Optional[datetime] = None
     shipped_at: Optional[datetime] = None
     delivered_at: Optional[datetime] = None
 
 
+class OrderStatusUpdate(BaseModel):
+    """One row of a bulk status update"""
+    uid: UUID
+    status: OrderStatus
+    tracking_number: Optional[str] = Field(None, max_length=100)
+
+
+class BulkOrderStatusUpdate(BaseModel):
+    """Schema for bulk status updates (e.g. a courier pickup)"""
+    updates: List[OrderStatusUpdate] = Field(..., min_length=1, max_length=1000)
+
+
+class OrderStatusUpdateResult(BaseModel):
+    """Per-row outcome of a bulk status update"""
+    uid: UUID
+    success: bool
+    message: str = ""
+
+
+class OrderAdminRow(BaseModel):
+    """Lean order projection for admin table rows"""
+    uid: UUID
+    order_number: Optional[str] = None
+    customer_email: EmailStr
+    customer_name: Optional[str] = None
+    status: OrderStatus
+    payment_status: PaymentStatus
+    total_amount: Decimal
+    item_count: int = 0
+    tracking_number: Optional[str] = None
+    created_at: datetime
+
+
+class OrderSummary(BaseModel):
+    """Compact order projection for customer order history"""
+    uid: UUID
+    order_number: Optional[str] = None
+    status: OrderStatus
+    payment_status: PaymentStatus
+    total_amount: Decimal
+    item_count: int = 0
+    created_at: datetime
+
+
+class OrderSummaryPage(BaseModel):
+    """Keyset-paginated page of order summaries"""
+    items: List[OrderSummary] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+class OrderPage(BaseModel):
+    """Keyset-paginated page of orders; pass next_cursor back to fetch the next page"""
+    items: List[OrderAdminRow] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
 # =============== USER MODELS ===============
 
 class UserRole(str, Enum):
@@ -262,6 +332,11 @@ class CouponCreate(BaseModel):
     maximum_discount_amount: Optional[Decimal] = Field(None, gt=0)
     usage_limit: Optional[int] = Field(None, gt=0)
     expires_at: datetime
+    # Per-customer rules, enforced through the coupon_redemptions ledger
+    per_customer_limit: Optional[int] = Field(None, gt=0)
+    first_order_only: bool = False
+    # >1 spreads redemptions of a hot code over counter shards (usage_limit is split between them)
+    redemption_shards: int = Field(default=1, ge=1, le=64)
 
 
 class Coupon(CouponCreate):
@@ -271,9 +346,127 @@ class Coupon(CouponCreate):
     uid: UUID = Field(default_factory=uuid4)
     is_active: bool = True
     usage_count: int = Field(default=0, ge=0)
+    campaign_id: Optional[UUID] = None  # set on codes generated in bulk
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CouponCampaignCreate(BaseModel):
+    """Bulk generation of unique single-use codes sharing one coupon template"""
+    name: str = Field(..., min_length=3, max_length=100)
+    code_prefix: str = Field(default="", pattern=r"^[A-Z0-9]{0,8}$")
+    quantity: int = Field(..., gt=0, le=1_000_000)
+    description: str = Field(..., min_length=5, max_length=200)
+    coupon_type: CouponType
+    value: Decimal = Field(..., gt=0)
+    minimum_order_amount: Decimal = Field(default=Decimal('0.00'), ge=0)
+    maximum_discount_amount: Optional[Decimal] = Field(None, gt=0)
+    usage_limit: int = Field(default=1, gt=0)  # per code
+    expires_at: datetime
+
+
+class CouponCampaignStatus(str, Enum):
+    """Code generation progress; GENERATING/FAILED campaigns can be resumed"""
+    GENERATING = "generating"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class CouponCampaign(BaseModel):
+    """
+    Campaign record; its codes carry campaign_id = uid
+    Holds the coupon template and the leased counter block, so generation can resume
+    """
+    uid: UUID = Field(default_factory=uuid4)
+    name: str
+    code_prefix: str
+    quantity: int
+    description: str
+    coupon_type: CouponType
+    value: Decimal
+    minimum_order_amount: Decimal = Decimal('0.00')
+    maximum_discount_amount: Optional[Decimal] = None
+    usage_limit: int = 1
+    expires_at: datetime
+    first_value: int = 0  # start of the leased coupon_code counter block
+    next_index: int = 0   # codes before this index have been inserted
+    generated: int = 0
+    status: CouponCampaignStatus = CouponCampaignStatus.GENERATING
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
+
+# =============== PROMOTION MODELS ===============
+
+class PromotionKind(str, Enum):
+    """How a promotion computes its discount"""
+    DISCOUNT = "discount"          # percentage/fixed off the items in scope
+    BUY_X_GET_Y = "buy_x_get_y"    # every buy+get units in scope, the cheapest get are discounted
+    TIERED = "tiered"              # best tier whose min_amount the in-scope spend reaches
+
+
+class StackingPolicy(str, Enum):
+    """How a promotion combines with others"""
+    STACKABLE = "stackable"  # adds to other stackable promotions
+    EXCLUSIVE = "exclusive"  # never combined; wins only if it beats the stack
+    STOP = "stop"            # stacks, but no lower-priority promotion is evaluated
+
+
+class PromotionTier(BaseModel):
+    """Spend threshold and the discount it unlocks"""
+    min_amount: Decimal = Field(..., ge=0)
+    value: Decimal = Field(..., gt=0)
+
+
+class PromotionCreate(BaseModel):
+    """Schema for creating promotions (rules are data, compiled by the promotion engine)"""
+    name: str = Field(..., min_length=3, max_length=100)
+    description: str = Field(default="", max_length=200)
+    kind: PromotionKind
+    value_type: CouponType = CouponType.PERCENTAGE  # for DISCOUNT, TIERED and the "get" units
+    value: Optional[Decimal] = Field(None, gt=0)    # DISCOUNT; BUY_X_GET_Y (defaults to 100% off)
+    tiers: List[PromotionTier] = Field(default_factory=list)
+    buy_quantity: Optional[int] = Field(None, gt=0)
+    get_quantity: Optional[int] = Field(None, gt=0)
+    categories: List[ProductCategory] = Field(default_factory=list)  # empty: whole cart
+    product_uids: List[UUID] = Field(default_factory=list)
+    minimum_order_amount: Decimal = Field(default=Decimal('0.00'), ge=0)
+    maximum_discount_amount: Optional[Decimal] = Field(None, gt=0)
+    priority: int = 0  # higher runs first
+    stacking: StackingPolicy = StackingPolicy.STACKABLE
+    auto_apply: bool = True
+    code: Optional[str] = Field(None, min_length=3, max_length=20)  # required when not auto-applied
+    starts_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+
+class Promotion(PromotionCreate):
+    """Complete promotion schema"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    uid: UUID = Field(default_factory=uuid4)
+    is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class CartQuoteRequest(BaseModel):
+    """Cart to price without placing an order"""
+    items: List[OrderItem] = Field(..., min_length=1)
+    coupon_code: Optional[str] = None
+
+
+class CartQuote(BaseModel):
+    """Price breakdown for a cart, as checkout would compute it"""
+    subtotal: Decimal
+    promotion_discount: Decimal
+    coupon_discount: Decimal
+    discount_amount: Decimal
+    shipping_cost: Decimal
+    tax_amount: Decimal
+    total_amount: Decimal
+    applied_promotions: List[AppliedPromotion] = Field(default_factory=list)
+    coupon_message: Optional[str] = None
+
+
 # =============== NEWSLETTER MODELS ===============
 
 class NewsletterSubscriber(BaseModel):
@@ -291,6 +484,39 @@ class SubscriberCreate(BaseModel):
     email: EmailStr
 
 
+class NewsletterCampaignStatus(str, Enum):
+    """Campaign lifecycle; FAILED campaigns resume where they stopped when sent again"""
+    DRAFT = "draft"
+    SENDING = "sending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class NewsletterCampaignCreate(BaseModel):
+    """
+    Newsletter mailing to every active subscriber
+    Templates are Jinja2; {{ email }} and {{ unsubscribe_url }} are filled in per recipient
+    """
+    name: str = Field(..., min_length=3, max_length=100)
+    subject: str = Field(..., min_length=1, max_length=200)
+    html_template: str = Field(..., min_length=1)
+    text_template: Optional[str] = None
+
+
+class NewsletterCampaign(BaseModel):
+    """Campaign record; per-recipient outcomes live in campaign_deliveries"""
+    uid: UUID = Field(default_factory=uuid4)
+    name: str
+    subject: str
+    html_template: str
+    text_template: Optional[str] = None
+    status: NewsletterCampaignStatus = NewsletterCampaignStatus.DRAFT
+    lease_until: Optional[datetime] = None  # set while a sender owns the campaign
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
 # =============== RESPONSE MODELS ===============
 
 class ResponseModel(BaseModel):
@@ -322,6 +548,12 @@ class CartItem(BaseModel):
     image_url: str = ""
 
 
+class StockCheckItem(BaseModel):
+    """One line of a stock availability check"""
+    product_uid: UUID
+    quantity: int = Field(..., gt=0)
+
+
 class CartState(BaseModel):
     """Complete cart state"""
     items: List[CartItem] = Field(default_factory=list)
@@ -6,7 +6,9 @@ from .products import router as products_router
 from .orders import router as orders_router
 from .newsletter import router as newsletter_router
 from .coupons import router as coupons_router
+from .promotions import router as promotions_router
 from .auth import router as auth_router
+from .analytics import router as analytics_router
 
 # Create main API router
 api_router = APIRouter()
@@ -17,5 +19,7 @@ api_router.include_router(products_router)
 api_router.include_router(orders_router)
 api_router.include_router(newsletter_router)
 api_router.include_router(coupons_router)
+api_router.include_router(promotions_router)
+api_router.include_router(analytics_router)
 
 __all__ = ["api_router"]
@@ -0,0 +1,119 @@
+# Dbanyan Group Backend - Sales Analytics API Routes
+# Served from the pre-aggregated sales cubes; no order scans per request
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from db import get_database
+from models import ResponseModel
+from services.analytics_service import sales_analytics, DIMENSIONS
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def resolve_window(start_date: Optional[date], end_date: Optional[date]):
+    """Inclusive date window, defaulting to the last 30 days"""
+    end = end_date or datetime.utcnow().date()
+    start = start_date or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must not be after end_date"
+        )
+    return start, end
+
+
+def require_cube():
+    if sales_analytics.cube() is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics have not been built yet"
+        )
+
+
+@router.get("/summary")
+async def get_sales_summary(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    """
+    Revenue, orders and units for a window vs. the preceding window of equal length
+    TODO: Add admin authentication middleware
+    """
+    require_cube()
+    return sales_analytics.summary(*resolve_window(start_date, end_date))
+
+
+@router.get("/revenue")
+async def get_revenue_series(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    dimension: Optional[str] = Query(None, pattern="^(product|category|state)$"),
+    key: Optional[str] = None
+):
+    """
+    Daily revenue series, optionally for one product uid, category or state
+    TODO: Add admin authentication middleware
+    """
+    if dimension and not key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="key is required when dimension is given"
+        )
+    require_cube()
+    start, end = resolve_window(start_date, end_date)
+    return {
+        "dimension": dimension,
+        "key": key,
+        "series": sales_analytics.revenue_series(start, end, dimension, key)
+    }
+
+
+@router.get("/top/{dimension}")
+async def get_top_performers(
+    dimension: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Top products, categories or states by revenue with period-over-period change
+    TODO: Add admin authentication middleware
+    """
+    if dimension not in DIMENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dimension; expected one of {', '.join(DIMENSIONS)}"
+        )
+    require_cube()
+    start, end = resolve_window(start_date, end_date)
+    return {
+        "dimension": dimension,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "items": sales_analytics.top(dimension, start, end, limit)
+    }
+
+
+@router.post("/rebuild", response_model=ResponseModel)
+async def rebuild_sales_analytics(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Recompute the sales cubes from all paid orders
+    TODO: Add admin authentication middleware
+    """
+    try:
+        result = await sales_analytics.rebuild(db)
+        return ResponseModel(
+            success=True,
+            message="Sales analytics rebuilt",
+            data=result
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rebuild sales analytics: {str(e)}"
+        )
@@ -353,8 +353,9 @@ async def get_current_user(
             detail="Invalid authentication credentials"
         )
     
-    user_uid = payload.get("sub")
-    if not user_uid:
+    try:
+        user_uid = UUID(payload["sub"])
+    except (KeyError, TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload"
@@ -1,25 +1,48 @@
 # Dbanyan Group Backend - Coupon API Routes
 # Implementing project_context.md Section 2.4: Coupon functionality - FR4.3
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from decimal import Decimal
+from uuid import UUID
 
+from config import settings
 from db import get_database
-from models import CouponCreate, Coupon, ResponseModel
+from models import (
+    CouponCreate, Coupon, CouponCampaign, CouponCampaignCreate, CouponCampaignStatus, ResponseModel
+)
 from services import CouponService
+from services.coupon_service import COUPON_NOT_FOUND
+from services.coupon_guard import coupon_guard
 
 router = APIRouter(prefix="/coupons", tags=["coupons"])
 
 
+def client_key(request: Request) -> str:
+    """
+    Client identity for guess throttling
+    Only hops appended by our own proxies (TRUSTED_PROXY_HOPS) are believed; anything
+    to their left is client-supplied and would let a guesser rotate identities
+    """
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded and settings.TRUSTED_PROXY_HOPS:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        return hops[-min(settings.TRUSTED_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
 @router.post("/validate")
 async def validate_coupon(
     validation_data: dict,  # {"code": "SAVE10", "order_amount": 500.00}
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Validate coupon code for checkout - FR4.3
     Fast validation for real-time feedback
+    Unknown codes are rejected from memory; clients that keep guessing are slowed, then refused
     """
     try:
         if "code" not in validation_data or "order_amount" not in validation_data:
@@ -28,13 +51,31 @@ async def validate_coupon(
                 detail="Code and order_amount are required"
             )
         
+        client = client_key(request)
+        delay = coupon_guard.delay_for(client)
+        if delay >= coupon_guard.block_after_seconds:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many invalid coupon attempts",
+                headers={"Retry-After": str(coupon_guard.window_seconds)}
+            )
+        if delay:
+            await asyncio.sleep(delay)
+        
         coupon_service = CouponService(db)
         result = await coupon_service.apply_coupon(
             validation_data["code"],
             Decimal(str(validation_data["order_amount"]))
         )
         
+        if result["message"] == COUPON_NOT_FOUND:
+            coupon_guard.record_failure(client)  # no such code: a guess
+        else:
+            coupon_guard.record_success(client)
+        
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -58,3 +99,108 @@ async def create_coupon(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create coupon: {str(e)}"
         )
+
+
+def campaign_progress(campaign: CouponCampaign) -> dict:
+    return {
+        "campaign_uid": str(campaign.uid),
+        "status": campaign.status.value,
+        "quantity": campaign.quantity,
+        "inserted": campaign.next_index,
+        "generated": campaign.generated
+    }
+
+
+@router.post("/campaigns", response_model=ResponseModel, status_code=status.HTTP_202_ACCEPTED)
+async def create_coupon_campaign(
+    campaign_data: CouponCampaignCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Create a campaign and generate its unique single-use codes in the background
+    Poll GET /coupons/campaigns/{uid}, then download the CSV from /codes; a run cut
+    short (e.g. by a worker restart) is continued by /resume or jobs.generate_campaign_codes
+    TODO: Add admin authentication middleware
+    """
+    try:
+        coupon_service = CouponService(db)
+        campaign = await coupon_service.create_campaign(campaign_data)
+        background_tasks.add_task(coupon_service.generate_campaign_codes, campaign.uid)
+        return ResponseModel(
+            success=True,
+            message=f"Generating {campaign.quantity} codes",
+            data=campaign_progress(campaign)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create campaign: {str(e)}"
+        )
+
+
+@router.get("/campaigns/{campaign_uid}", response_model=ResponseModel)
+async def get_coupon_campaign(
+    campaign_uid: UUID,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Code generation progress for a campaign
+    TODO: Add admin authentication middleware
+    """
+    campaign = await CouponService(db).get_campaign(campaign_uid)
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    return ResponseModel(success=True, data=campaign_progress(campaign))
+
+
+@router.post("/campaigns/{campaign_uid}/resume", response_model=ResponseModel, status_code=status.HTTP_202_ACCEPTED)
+async def resume_coupon_campaign(
+    campaign_uid: UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Continue code generation that stopped (error or worker restart) after its last finished chunk
+    TODO: Add admin authentication middleware
+    """
+    coupon_service = CouponService(db)
+    campaign = await coupon_service.get_campaign(campaign_uid)
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    if campaign.status == CouponCampaignStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Campaign codes are already generated"
+        )
+    
+    background_tasks.add_task(coupon_service.generate_campaign_codes, campaign.uid)
+    return ResponseModel(success=True, message="Code generation resumed", data=campaign_progress(campaign))
+
+
+@router.get("/campaigns/{campaign_uid}/codes")
+async def export_campaign_codes(
+    campaign_uid: UUID,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Download a campaign's codes again as CSV
+    TODO: Add admin authentication middleware
+    """
+    if not await db.coupon_campaigns.find_one({"uid": campaign_uid}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    
+    return StreamingResponse(
+        CouponService(db).export_campaign_codes(campaign_uid),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="campaign-{campaign_uid}.csv"'}
+    )
@@ -1,12 +1,15 @@
 # Dbanyan Group Backend - Newsletter API Routes
 # Implementing project_context.md Section 2.7: Newsletter signup - FR7.2
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from uuid import UUID
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from db import get_database
-from models import SubscriberCreate, ResponseModel
-from services import NewsletterService
+from models import NewsletterCampaign, NewsletterCampaignCreate, SubscriberCreate, ResponseModel
+from services import CampaignService, NewsletterService
 
 router = APIRouter(prefix="/newsletter", tags=["newsletter"])
 
@@ -78,3 +81,128 @@ async def unsubscribe_newsletter(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to unsubscribe: {str(e)}"
         )
+
+
+@router.post("/admin/import", response_model=ResponseModel)
+async def import_subscribers(
+    file: UploadFile = File(...),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Bulk-import subscribers from a CSV upload (an "email" column, or the first column)
+    Returns added/reactivated/already-active/duplicate/invalid counts
+    TODO: Add admin authentication middleware
+    """
+    async def chunks():
+        while chunk := await file.read(64 * 1024):
+            yield chunk
+    
+    try:
+        newsletter_service = NewsletterService(db)
+        summary = await newsletter_service.import_subscribers(chunks())
+        return ResponseModel(
+            success=True,
+            message=f"Imported {summary['added']} new and {summary['reactivated']} reactivated subscribers",
+            data=summary
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import subscribers: {str(e)}"
+        )
+
+
+@router.get("/admin/export")
+async def export_subscribers(
+    active_only: bool = True,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Stream subscribers as CSV in constant memory
+    TODO: Add admin authentication middleware
+    """
+    newsletter_service = NewsletterService(db)
+    filename = f"subscribers-{datetime.utcnow():%Y%m%d}.csv"
+    return StreamingResponse(
+        newsletter_service.export_subscribers(active_only),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/admin/campaigns", response_model=NewsletterCampaign)
+async def create_campaign(
+    campaign_data: NewsletterCampaignCreate,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Create a draft campaign; templates may use {{ email }} and {{ unsubscribe_url }}
+    TODO: Add admin authentication middleware
+    """
+    try:
+        campaign_service = CampaignService(db)
+        return await campaign_service.create_campaign(campaign_data)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create campaign: {str(e)}"
+        )
+
+
+@router.post("/admin/campaigns/{campaign_uid}/send", response_model=ResponseModel)
+async def send_campaign(
+    campaign_uid: UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Start (or resume) sending a campaign in the background
+    For large lists prefer the jobs.send_campaign CLI, which does not tie up an API worker
+    TODO: Add admin authentication middleware
+    """
+    try:
+        campaign_service = CampaignService(db)
+        campaign = await campaign_service.claim_campaign(campaign_uid)
+        if campaign is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Campaign not found, already completed or being sent"
+            )
+        
+        background_tasks.add_task(campaign_service.deliver_campaign, campaign)
+        return ResponseModel(success=True, message="Campaign sending started")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to start campaign: {str(e)}"
+        )
+
+
+@router.get("/admin/campaigns/{campaign_uid}", response_model=ResponseModel)
+async def get_campaign_progress(
+    campaign_uid: UUID,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Campaign status with sent/rejected/failed counts
+    TODO: Add admin authentication middleware
+    """
+    try:
+        campaign_service = CampaignService(db)
+        progress = await campaign_service.get_progress(campaign_uid)
+        if progress is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Campaign not found"
+            )
+        
+        return ResponseModel(success=True, data=progress)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch campaign: {str(e)}"
+        )
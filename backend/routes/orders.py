@@ -2,21 +2,58 @@
 # Implementing project_context.md Section 2.4: Cart & Checkout Flow
 # FR4.1-FR4.5: Complete checkout with Razorpay integration
 
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime, date
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from db import get_database
-from models import Order, OrderCreate, OrderStatus, ResponseModel
-from services import OrderService
+from models import (
+    Order, OrderCreate, OrderStatus, OrderPage, OrderSummaryPage, PaymentStatus,
+    BulkOrderStatusUpdate, ResponseModel
+)
+from services import OrderService, OrderStatsService
+from services.email_service import email_service
+from services.order_events import order_event_broker
+from services.checkout_admission import checkout_admission, AdmissionRejected
+from services.order_number_service import normalize_order_number
+from services.invoice_service import invoice_service
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
+@asynccontextmanager
+async def checkout_slot(order_data: OrderCreate, request: Request):
+    """
+    Admission control for checkout routes
+    Over capacity: 503 + Retry-After and a queue token to resend as X-Checkout-Token
+    """
+    try:
+        async with checkout_admission.admit(
+            [item.product_uid for item in order_data.items],
+            request.headers.get("X-Checkout-Token")
+        ):
+            yield
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "message": e.reason,
+                "queue_token": e.token,
+                "queue_position": e.position,
+                "retry_after": e.retry_after
+            },
+            headers={"Retry-After": str(e.retry_after), "X-Checkout-Token": e.token}
+        )
+
+
 @router.post("/create")
 async def create_order(
     order_data: OrderCreate,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
@@ -25,7 +62,8 @@ async def create_order(
     """
     try:
         order_service = OrderService(db)
-        result = await order_service.create_order(order_data)
+        async with checkout_slot(order_data, request):
+            result = await order_service.create_order(order_data)
         
         if not result["success"]:
             raise HTTPException(
@@ -46,6 +84,7 @@ async def create_order(
 @router.post("/create-cod")
 async def create_cod_order(
     order_data: OrderCreate,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
@@ -54,7 +93,8 @@ async def create_cod_order(
     """
     try:
         order_service = OrderService(db)
-        result = await order_service.create_cod_order(order_data)
+        async with checkout_slot(order_data, request):
+            result = await order_service.create_cod_order(order_data)
         
         if not result["success"]:
             raise HTTPException(
@@ -74,11 +114,13 @@ async def create_cod_order(
 
 @router.post("/confirm-payment")
 async def confirm_payment(
-    payment_data: dict
+    payment_data: dict,
+    db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Confirm payment after Razorpay success - FR4.5
     Updates order status and decrements inventory
+    Idempotent: replays of an already confirmed payment return success without side effects
     """
     try:
         # Validate required fields
@@ -109,6 +151,41 @@ async def confirm_payment(
         )
 
 
+@router.get("/number/{order_number}", response_model=Order)
+async def get_order_by_number(
+    order_number: str,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get order by human-readable order number (as read out by customers)
+    """
+    canonical = normalize_order_number(order_number)
+    if not canonical:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid order number"
+        )
+    
+    try:
+        order_service = OrderService(db)
+        order = await order_service.get_order_by_number(canonical)
+        
+        if not order:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found"
+            )
+        
+        return order
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch order: {str(e)}"
+        )
+
+
 @router.get("/{order_uid}", response_model=Order)
 async def get_order(
     order_uid: UUID,
@@ -137,18 +214,87 @@ async def get_order(
         )
 
 
-@router.get("/customer/{email}", response_model=List[Order])
+@router.get("/{order_uid}/events")
+async def order_events(
+    order_uid: UUID,
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Live order status via Server-Sent Events
+    Sends a snapshot on connect, then payment/shipping updates as they happen
+    """
+    order_ref = await db.orders.find_one({"uid": order_uid}, {"_id": 1})
+    if not order_ref:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    return StreamingResponse(
+        order_event_broker.event_stream(order_ref["_id"], request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{order_uid}/invoice")
+async def get_order_invoice(
+    order_uid: UUID,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Download the GST tax invoice PDF for an order
+    Rendered once per order version, then served straight from the disk cache
+    """
+    try:
+        order = await OrderService(db).get_order_by_uid(order_uid)
+        if not order:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found"
+            )
+        if not invoice_service.is_invoiceable(order):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="No invoice is issued for cancelled or unpaid orders"
+            )
+        
+        path, cached = await invoice_service.get_invoice(order)
+        return FileResponse(
+            path,
+            media_type="application/pdf",
+            filename=f"invoice-{order.order_number or order.uid}.pdf",
+            headers={"X-Invoice-Cache": "hit" if cached else "miss"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate invoice: {str(e)}"
+        )
+
+
+@router.get("/customer/{email}", response_model=OrderSummaryPage)
 async def get_customer_orders(
     email: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
-    Get all orders for a customer email
+    Get a page of order summaries for a customer email
+    Full order detail is fetched per order via GET /orders/{order_uid}
     """
     try:
         order_service = OrderService(db)
-        orders = await order_service.get_orders_by_email(email)
-        return orders
+        return await order_service.get_orders_by_email(email, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -198,21 +344,63 @@ async def update_order_status(
         )
 
 
-@router.get("/admin/all", response_model=List[Order])
+@router.patch("/admin/bulk-status")
+async def bulk_update_order_status(
+    bulk_data: BulkOrderStatusUpdate,
+    background_tasks: BackgroundTasks,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Update status/tracking for many orders in one request (batch shipping)
+    Customer notifications are sent afterwards as a single batch
+    TODO: Add admin authentication middleware
+    """
+    try:
+        order_service = OrderService(db)
+        result = await order_service.bulk_update_order_status(bulk_data.updates)
+        
+        notifications = result.pop("notifications")
+        if notifications:
+            background_tasks.add_task(email_service.send_order_status_emails, notifications)
+        
+        return result
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update order statuses: {str(e)}"
+        )
+
+
+@router.get("/admin/all", response_model=OrderPage)
 async def get_all_orders_admin(
-    skip: int = 0,
-    limit: int = 100,
-    status_filter: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status_filter: Optional[OrderStatus] = None,
+    payment_status: Optional[PaymentStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
-    Get all orders for admin dashboard
+    Get orders for admin dashboard, newest first
+    Pass the returned next_cursor to fetch the following page
     TODO: Add admin authentication middleware
     """
     try:
         order_service = OrderService(db)
-        orders = await order_service.get_all_orders_admin(skip, limit, status_filter)
-        return orders
+        return await order_service.get_all_orders_admin(
+            limit=limit,
+            cursor=cursor,
+            status_filter=status_filter.value if status_filter else None,
+            payment_status=payment_status.value if payment_status else None,
+            created_from=created_from,
+            created_to=created_to
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -220,20 +408,104 @@ async def get_all_orders_admin(
         )
 
 
+@router.get("/admin/export")
+async def export_orders_admin(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    flatten_items: bool = False,
+    status_filter: Optional[OrderStatus] = None,
+    payment_status: Optional[PaymentStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Stream orders as NDJSON or CSV for finance and fulfilment
+    flatten_items=true emits one row per line item
+    TODO: Add admin authentication middleware
+    """
+    order_service = OrderService(db)
+    chunks = order_service.export_orders(
+        export_format=format,
+        flatten_items=flatten_items,
+        status_filter=status_filter.value if status_filter else None,
+        payment_status=payment_status.value if payment_status else None,
+        created_from=created_from,
+        created_to=created_to
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=orders.{format}"}
+    )
+
+
+@router.post("/admin/invoices/batch", response_model=ResponseModel)
+async def generate_invoices_batch(
+    background_tasks: BackgroundTasks,
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Month-end batch: pre-render invoices for every order created in the month
+    Runs in the background; already-cached invoices are skipped
+    TODO: Add admin authentication middleware
+    """
+    background_tasks.add_task(invoice_service.generate_month, db, year, month)
+    return ResponseModel(
+        success=True,
+        message=f"Invoice generation started for {year}-{month:02d}"
+    )
+
+
+@router.get("/admin/checkout-metrics")
+async def get_checkout_metrics_admin():
+    """
+    Checkout admission metrics: active slots, queue depth, admit rate
+    TODO: Add admin authentication middleware
+    """
+    return checkout_admission.metrics()
+
+
 @router.get("/admin/stats")
 async def get_order_stats_admin(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
-    Get order statistics for admin dashboard
+    Get order statistics for admin dashboard over an optional inclusive date range
     TODO: Add admin authentication middleware
     """
     try:
         order_service = OrderService(db)
-        stats = await order_service.get_order_stats()
+        stats = await order_service.get_order_stats(start_date, end_date)
         return stats
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch order stats: {str(e)}"
         )
+
+
+@router.post("/admin/stats/rebuild", response_model=ResponseModel)
+async def rebuild_order_stats_admin(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Recompute the daily stats rollups from the orders collection
+    TODO: Add admin authentication middleware
+    """
+    try:
+        days = await OrderStatsService(db).rebuild()
+        return ResponseModel(
+            success=True,
+            message="Order stats rebuilt",
+            data={"days": days}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rebuild order stats: {str(e)}"
+        )
@@ -10,7 +10,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from db import get_database
 from models import (
     Product, ProductCreate, ProductUpdate, ProductCategory,
-    ResponseModel, PaginatedResponse
+    ResponseModel, PaginatedResponse, StockCheckItem
 )
 from services import ProductService
 
@@ -202,7 +202,7 @@ async def update_product_quantity(
 
 @router.post("/check-stock")
 async def check_stock_availability(
-    items: List[dict],  # [{"product_uid": "...", "quantity": 1}, ...]
+    items: List[StockCheckItem],
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
@@ -211,7 +211,9 @@ async def check_stock_availability(
     """
     try:
         product_service = ProductService(db)
-        availability = await product_service.check_stock_availability(items)
+        availability = await product_service.check_stock_availability(
+            [item.model_dump() for item in items]
+        )
         return availability
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,98 @@
+# Dbanyan Group Backend - Promotion API Routes
+# Cart quotes against the compiled promotion rules, plus promotion management
+
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from db import get_database
+from models import CartQuote, CartQuoteRequest, Promotion, PromotionCreate, ResponseModel
+from services import OrderService, PromotionService
+
+router = APIRouter(prefix="/promotions", tags=["promotions"])
+
+
+@router.post("/quote", response_model=CartQuote)
+async def quote_cart(
+    quote_request: CartQuoteRequest,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Price a cart with all applicable promotions and an optional coupon
+    Cheap enough to call on every cart change
+    """
+    try:
+        order_service = OrderService(db)
+        return await order_service.quote_cart(quote_request.items, quote_request.coupon_code)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to quote cart: {str(e)}"
+        )
+
+
+@router.get("/", response_model=List[Promotion])
+async def get_promotions(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    List active promotions, highest priority first
+    TODO: Add admin authentication middleware
+    """
+    try:
+        promotion_service = PromotionService(db)
+        return await promotion_service.get_active_promotions()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch promotions: {str(e)}"
+        )
+
+
+@router.post("/", response_model=Promotion, status_code=status.HTTP_201_CREATED)
+async def create_promotion(
+    promotion_data: PromotionCreate,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Create new promotion (Admin only - will add auth later)
+    """
+    try:
+        promotion_service = PromotionService(db)
+        return await promotion_service.create_promotion(promotion_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create promotion: {str(e)}"
+        )
+
+
+@router.patch("/{promotion_uid}/deactivate", response_model=ResponseModel)
+async def deactivate_promotion(
+    promotion_uid: UUID,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Deactivate a promotion (Admin only - will add auth later)
+    """
+    try:
+        promotion_service = PromotionService(db)
+        if not await promotion_service.deactivate_promotion(promotion_uid):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Active promotion not found"
+            )
+        return ResponseModel(success=True, message="Promotion deactivated")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to deactivate promotion: {str(e)}"
+        )
@@ -11,6 +11,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from config import settings
 from models import (
     Product, ProductCategory, ProductImage, NutritionInfo,
     CouponCreate, CouponType
@@ -25,7 +26,8 @@ async def seed_database():
     MONGODB_URI = "mongodb://localhost:27017"  # Update with your MongoDB URI
     DB_NAME = "dbanyan"
     
-    client = AsyncIOMotorClient(MONGODB_URI)
+    # Services store uuid.UUID values natively, which needs an explicit representation
+    client = AsyncIOMotorClient(MONGODB_URI, uuidRepresentation=settings.MONGODB_UUID_REPRESENTATION)
     db = client[DB_NAME]
     
     try:
@@ -4,14 +4,20 @@
 
 from .product_service import ProductService
 from .order_service import OrderService
+from .order_stats_service import OrderStatsService
 from .coupon_service import CouponService
+from .promotion_service import PromotionService
 from .newsletter_service import NewsletterService
+from .campaign_service import CampaignService
 from .auth_service import AuthService
 
 __all__ = [
     "ProductService",
     "OrderService", 
+    "OrderStatsService",
     "CouponService",
+    "PromotionService",
     "NewsletterService",
+    "CampaignService",
     "AuthService"
 ]
@@ -0,0 +1,307 @@
+# Dbanyan Group Backend - Sales Analytics Engine
+# Paid orders pre-aggregated into per-day cubes (product, category, state) held as
+# NumPy arrays with prefix sums, so any date window, top-N or period-over-period
+# comparison is answered in milliseconds without scanning orders
+# Cubes are rebuilt by a job and persisted compactly as a compressed .npz file
+
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from codec import decode_value
+from config import settings
+from models import PaymentStatus
+from services.order_stats_service import to_paise
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("product", "category", "state")
+CUBE_FILENAME = "sales_cube.npz"
+
+
+def _paid_orders_pipeline(*stages: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pipeline over paid orders in both live and archived collections"""
+    match = {"$match": {"payment_status": PaymentStatus.COMPLETED.value}}
+    return [
+        match,
+        {"$unionWith": {"coll": "orders_archive", "pipeline": [match]}},
+        *stages
+    ]
+
+
+class SalesCube:
+    """
+    Immutable snapshot of the cubes
+    Product revenue is line-item revenue (before discount, tax, shipping);
+    state revenue is order total_amount
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.start_day = date.fromisoformat(str(arrays["start_day"]))
+        self.built_at = str(arrays["built_at"])
+        self.product_uids = arrays["product_uids"]
+        self.product_names = arrays["product_names"]
+        self.product_category = arrays["product_category"]  # index into categories
+        self.categories = arrays["categories"]
+        self.states = arrays["states"]
+        self.product_revenue = arrays["product_revenue"]  # [days, products] paise
+        self.product_units = arrays["product_units"]      # [days, products]
+        self.state_revenue = arrays["state_revenue"]      # [days, states] paise
+        self.state_orders = arrays["state_orders"]        # [days, states]
+        self.days = self.product_revenue.shape[0]
+
+        # Prefix sums along the day axis: window sum = cum[end] - cum[start]
+        self._cumulative = {
+            name: self._prefix(getattr(self, name))
+            for name in ("product_revenue", "product_units", "state_revenue", "state_orders")
+        }
+
+    @staticmethod
+    def _prefix(values: np.ndarray) -> np.ndarray:
+        cumulative = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=np.int64)
+        np.cumsum(values, axis=0, out=cumulative[1:])
+        return cumulative
+
+    def index_range(self, start: date, end: date) -> Tuple[int, int]:
+        """Half-open day-index range for an inclusive date window, clipped to the cube"""
+        first = (start - self.start_day).days
+        last = (end - self.start_day).days + 1
+        return max(0, min(first, self.days)), max(0, min(last, self.days))
+
+    def window_sum(self, name: str, first: int, last: int) -> np.ndarray:
+        cumulative = self._cumulative[name]
+        return cumulative[last] - cumulative[first]
+
+    def window(self, name: str, start: date, end: date) -> np.ndarray:
+        return self.window_sum(name, *self.index_range(start, end))
+
+
+class SalesAnalyticsEngine:
+    """Builds, persists and queries the sales cubes"""
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, CUBE_FILENAME)
+        self._cube: Optional[SalesCube] = None
+        self._loaded_mtime: Optional[float] = None
+
+    # ---------- build & persistence ----------
+
+    async def rebuild(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Aggregate all paid orders into fresh cubes and persist them"""
+        day_expr = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+        product_rows = await db.orders.aggregate(_paid_orders_pipeline(
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": {"day": day_expr, "product": "$items.product_uid"},
+                "name": {"$last": "$items.product_name"},
+                "revenue": {"$sum": "$items.total_price"},
+                "units": {"$sum": "$items.quantity"}
+            }}
+        ), allowDiskUse=True).to_list(length=None)
+        state_rows = await db.orders.aggregate(_paid_orders_pipeline(
+            {"$group": {
+                "_id": {"day": day_expr, "state": "$shipping_address.state"},
+                "revenue": {"$sum": "$total_amount"},
+                "orders": {"$sum": 1}
+            }}
+        ), allowDiskUse=True).to_list(length=None)
+
+        catalog = {
+            str(doc["uid"]): doc
+            async for doc in db.products.find({}, {"uid": 1, "name": 1, "category": 1})
+        }
+
+        order_days = {date.fromisoformat(row["_id"]["day"]) for row in product_rows + state_rows}
+        today = datetime.utcnow().date()
+        start_day = min(order_days, default=today)
+        days = (max(order_days | {today}) - start_day).days + 1
+
+        product_uids = sorted({str(row["_id"]["product"]) for row in product_rows})
+        product_index = {uid: i for i, uid in enumerate(product_uids)}
+        product_names = {str(row["_id"]["product"]): row["name"] for row in product_rows}
+        categories = sorted({catalog.get(uid, {}).get("category", "unknown") for uid in product_uids})
+        category_index = {category: i for i, category in enumerate(categories)}
+        states = sorted({(row["_id"]["state"] or "unknown").strip().title() for row in state_rows})
+        state_index = {state: i for i, state in enumerate(states)}
+
+        product_revenue = np.zeros((days, len(product_uids)), dtype=np.int64)
+        product_units = np.zeros((days, len(product_uids)), dtype=np.int64)
+        for row in product_rows:
+            day = (date.fromisoformat(row["_id"]["day"]) - start_day).days
+            column = product_index[str(row["_id"]["product"])]
+            product_revenue[day, column] += to_paise(decode_value(row["revenue"]))
+            product_units[day, column] += row["units"]
+
+        state_revenue = np.zeros((days, len(states)), dtype=np.int64)
+        state_orders = np.zeros((days, len(states)), dtype=np.int64)
+        for row in state_rows:
+            day = (date.fromisoformat(row["_id"]["day"]) - start_day).days
+            column = state_index[(row["_id"]["state"] or "unknown").strip().title()]
+            state_revenue[day, column] += to_paise(decode_value(row["revenue"]))
+            state_orders[day, column] += row["orders"]
+
+        arrays = {
+            "start_day": np.array(start_day.isoformat()),
+            "built_at": np.array(datetime.utcnow().isoformat()),
+            "product_uids": np.array(product_uids, dtype=str),
+            "product_names": np.array(
+                [catalog.get(uid, {}).get("name") or product_names[uid] for uid in product_uids], dtype=str
+            ),
+            "product_category": np.array(
+                [category_index[catalog.get(uid, {}).get("category", "unknown")] for uid in product_uids],
+                dtype=np.int32
+            ),
+            "categories": np.array(categories, dtype=str),
+            "states": np.array(states, dtype=str),
+            "product_revenue": product_revenue,
+            "product_units": product_units,
+            "state_revenue": state_revenue,
+            "state_orders": state_orders,
+        }
+        self._save(arrays)
+        self._cube = SalesCube(arrays)
+        self._loaded_mtime = os.path.getmtime(self.path)
+
+        logger.info(f"Sales cubes rebuilt: {days} days, {len(product_uids)} products, {len(states)} states")
+        return {"days": days, "products": len(product_uids), "states": len(states)}
+
+    def _save(self, arrays: Dict[str, np.ndarray]) -> None:
+        """Write atomically so other workers never load a half-written file"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp.npz"
+        np.savez_compressed(temp_path, **arrays)
+        os.replace(temp_path, self.path)
+
+    def cube(self) -> Optional[SalesCube]:
+        """Current cube, reloading if another worker/job wrote a newer file"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._cube
+        if mtime != self._loaded_mtime:
+            with np.load(self.path, allow_pickle=False) as data:
+                self._cube = SalesCube({name: data[name] for name in data.files})
+            self._loaded_mtime = mtime
+        return self._cube
+
+    # ---------- queries ----------
+
+    @staticmethod
+    def _previous_window(start: date, end: date) -> Tuple[date, date]:
+        length = (end - start).days + 1
+        return start - timedelta(days=length), start - timedelta(days=1)
+
+    @staticmethod
+    def _change(current: float, previous: float) -> Optional[float]:
+        return round((current - previous) / previous * 100, 2) if previous else None
+
+    def _dimension_totals(self, cube: SalesCube, dimension: str, start: date, end: date):
+        """(labels, keys, revenue paise, volume) for every member of a dimension"""
+        if dimension == "state":
+            return (cube.states, cube.states,
+                    cube.window("state_revenue", start, end), cube.window("state_orders", start, end))
+
+        revenue = cube.window("product_revenue", start, end)
+        units = cube.window("product_units", start, end)
+        if dimension == "product":
+            return cube.product_names, cube.product_uids, revenue, units
+
+        size = len(cube.categories)
+        return (cube.categories, cube.categories,
+                np.bincount(cube.product_category, weights=revenue, minlength=size).astype(np.int64),
+                np.bincount(cube.product_category, weights=units, minlength=size).astype(np.int64))
+
+    def summary(self, start: date, end: date) -> Dict[str, Any]:
+        """Totals for a window against the preceding window of equal length"""
+        cube = self.cube()
+        if cube is None:
+            return {}
+        previous_start, previous_end = self._previous_window(start, end)
+
+        def totals(window_start: date, window_end: date) -> Dict[str, float]:
+            revenue = int(cube.window("state_revenue", window_start, window_end).sum())
+            orders = int(cube.window("state_orders", window_start, window_end).sum())
+            units = int(cube.window("product_units", window_start, window_end).sum())
+            return {
+                "revenue": revenue / 100,
+                "orders": orders,
+                "units": units,
+                "avg_order_value": revenue / 100 / orders if orders else 0
+            }
+
+        current = totals(start, end)
+        previous = totals(previous_start, previous_end)
+        return {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "current": current,
+            "previous": previous,
+            "change_pct": {key: self._change(current[key], previous[key]) for key in current},
+            "built_at": cube.built_at
+        }
+
+    def revenue_series(
+        self,
+        start: date,
+        end: date,
+        dimension: Optional[str] = None,
+        key: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Daily revenue for the whole shop or one product/category/state"""
+        cube = self.cube()
+        if cube is None:
+            return []
+        first, last = cube.index_range(start, end)
+
+        if dimension == "state":
+            matches = np.flatnonzero(cube.states == key)
+            values = cube.state_revenue[first:last, matches].sum(axis=1)
+        elif dimension == "product":
+            matches = np.flatnonzero(cube.product_uids == key)
+            values = cube.product_revenue[first:last, matches].sum(axis=1)
+        elif dimension == "category":
+            matches = np.flatnonzero(cube.categories == key)
+            columns = np.flatnonzero(np.isin(cube.product_category, matches))
+            values = cube.product_revenue[first:last, columns].sum(axis=1)
+        else:
+            values = cube.state_revenue[first:last].sum(axis=1)
+
+        return [
+            {"date": (cube.start_day + timedelta(days=first + offset)).isoformat(), "revenue": int(value) / 100}
+            for offset, value in enumerate(values)
+        ]
+
+    def top(self, dimension: str, start: date, end: date, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top-N members of a dimension by revenue, with period-over-period change"""
+        cube = self.cube()
+        if cube is None:
+            return []
+        labels, keys, revenue, volume = self._dimension_totals(cube, dimension, start, end)
+        _, _, previous_revenue, _ = self._dimension_totals(cube, dimension, *self._previous_window(start, end))
+
+        limit = min(limit, len(revenue))
+        if not limit:
+            return []
+        # argpartition keeps top-N O(n) before sorting just the winners
+        candidates = np.argpartition(-revenue, limit - 1)[:limit]
+        ranked = candidates[np.argsort(-revenue[candidates], kind="stable")]
+
+        return [
+            {
+                "key": str(keys[i]),
+                "label": str(labels[i]),
+                "revenue": int(revenue[i]) / 100,
+                "volume": int(volume[i]),
+                "previous_revenue": int(previous_revenue[i]) / 100,
+                "change_pct": self._change(int(revenue[i]), int(previous_revenue[i]))
+            }
+            for i in ranked
+        ]
+
+
+# Global sales analytics engine instance
+sales_analytics = SalesAnalyticsEngine(settings.ANALYTICS_DATA_DIR)
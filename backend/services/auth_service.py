@@ -11,6 +11,7 @@ import jwt
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from models import User, UserCreate, UserLogin, UserResponse, Token, UserRole
 from config import settings
+from codec import to_document, from_document, decode_value
 
 logger = logging.getLogger(__name__)
 
@@ -43,9 +44,7 @@ class AuthService:
             )
             
             # Insert into database
-            result = await self.collection.insert_one(
-                user.model_dump(mode='json')
-            )
+            result = await self.collection.insert_one(to_document(user))
             
             if result.inserted_id:
                 logger.info(f"User created: {user.email}")
@@ -64,9 +63,7 @@ class AuthService:
             if not user_doc:
                 return None
             
-            # Convert to User model
-            user_doc['uid'] = UUID(user_doc['uid'])
-            user = User(**user_doc)
+            user = from_document(User, user_doc)
             
             # Verify password
             if not self.verify_password(login_data.password, user.password_hash):
@@ -74,7 +71,7 @@ class AuthService:
             
             # Update last login
             await self.collection.update_one(
-                {"uid": str(user.uid)},
+                {"uid": user.uid},
                 {"$set": {"last_login": datetime.utcnow()}}
             )
             
@@ -87,10 +84,9 @@ class AuthService:
     async def get_user_by_uid(self, uid: UUID) -> Optional[User]:
         """Get user by UID"""
         try:
-            user_doc = await self.collection.find_one({"uid": str(uid)})
+            user_doc = await self.collection.find_one({"uid": uid})
             if user_doc:
-                user_doc['uid'] = UUID(user_doc['uid'])
-                return User(**user_doc)
+                return from_document(User, user_doc)
             return None
             
         except Exception as e:
@@ -102,8 +98,7 @@ class AuthService:
         try:
             user_doc = await self.collection.find_one({"email": email})
             if user_doc:
-                user_doc['uid'] = UUID(user_doc['uid'])
-                return User(**user_doc)
+                return from_document(User, user_doc)
             return None
             
         except Exception as e:
@@ -218,7 +213,7 @@ class AuthService:
             # Update password
             hashed_password = self.hash_password(new_password)
             await self.collection.update_one(
-                {"uid": str(user_uid)},
+                {"uid": user_uid},
                 {
                     "$set": {
                         "password_hash": hashed_password,
@@ -251,7 +246,7 @@ class AuthService:
             
             # Update user
             result = await self.collection.update_one(
-                {"uid": str(user_uid)},
+                {"uid": user_uid},
                 {"$set": filtered_data}
             )
             
@@ -270,14 +265,13 @@ class AuthService:
         """Get all users for admin dashboard"""
         try:
             cursor = self.collection.find({}, {
+                "_id": 0,
                 "password_hash": 0  # Exclude password hash from results
             }).skip(skip).limit(limit).sort("created_at", -1)
             
             users = []
             async for user_doc in cursor:
-                # Convert UUID fields
-                user_doc['uid'] = str(user_doc['uid'])
-                users.append(user_doc)
+                users.append(decode_value(user_doc))
             
             return users
         except Exception as e:
@@ -0,0 +1,426 @@
+# Dbanyan Group Backend - Newsletter Campaign Sender
+# A campaign's templates are rendered once, with per-recipient fields left as
+# placeholders, so personalizing a message is a string join rather than a
+# template render. Messages fan out over a small pool of persistent SMTP
+# connections behind a token bucket, and every recipient's outcome is written
+# to campaign_deliveries as it happens, so a crashed or stopped send resumes
+# without mailing anyone twice
+# Local testing: SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_USE_TLS=false with
+# python -m aiosmtpd -n -l localhost:1025
+
+import asyncio
+import html
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from uuid import UUID
+
+import aiosmtplib
+from jinja2 import Environment
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from codec import from_document, to_document
+from config import settings
+from models import NewsletterCampaign, NewsletterCampaignCreate, NewsletterCampaignStatus
+from services.newsletter_service import NewsletterService
+
+logger = logging.getLogger(__name__)
+
+# Fields filled in per recipient; everything else is rendered once per campaign
+RECIPIENT_FIELDS = ("email", "unsubscribe_url")
+PLACEHOLDER = "\x1f{}\x1f"
+PLACEHOLDER_PATTERN = re.compile("\x1f(\\d+)\x1f")
+
+# Delivery statuses that are never retried on resume ("failed" is transient and is)
+DELIVERY_SENT = "sent"
+DELIVERY_REJECTED = "rejected"
+DELIVERY_FAILED = "failed"
+FINAL_DELIVERY_STATUSES = [DELIVERY_SENT, DELIVERY_REJECTED]
+
+# Connection-level errors: reconnect and retry the message once
+RECONNECT_ERRORS = (aiosmtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class SMTPUnavailable(Exception):
+    """The SMTP server cannot be reached or refuses our login; stops the send"""
+
+
+class CampaignTemplate:
+    """A template rendered once; personalize() splices recipient values into the result"""
+
+    def __init__(self, source: str, context: Dict[str, Any], escape: bool = False):
+        self.escape = escape
+        placeholders = {field: PLACEHOLDER.format(i) for i, field in enumerate(RECIPIENT_FIELDS)}
+        rendered = Environment(autoescape=escape).from_string(source).render(**context, **placeholders)
+        # Even indexes are literal text, odd indexes are recipient field numbers
+        parts = PLACEHOLDER_PATTERN.split(rendered)
+        self._parts: List[Any] = [
+            int(part) if i % 2 else part for i, part in enumerate(parts)
+        ]
+
+    def personalize(self, values: Tuple[str, ...]) -> str:
+        if self.escape:
+            values = tuple(html.escape(value) for value in values)
+        return "".join(
+            values[part] if i % 2 else part for i, part in enumerate(self._parts)
+        )
+
+
+class TokenBucket:
+    """Async token bucket: `rate` sends per second with bursts of up to `burst` (rate 0: unlimited)"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SMTPPool:
+    """Fixed set of persistent SMTP sessions, (re)connected lazily and reused across messages"""
+
+    def __init__(
+        self,
+        size: int,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        timeout: float = 30
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(max(1, size)):
+            self._idle.put_nowait(
+                aiosmtplib.SMTP(hostname=hostname, port=port, start_tls=use_tls, timeout=timeout)
+            )
+        self.connects = 0
+
+    async def _connect(self, client: aiosmtplib.SMTP) -> None:
+        if client.is_connected:
+            client.close()
+        try:
+            await client.connect()  # STARTTLS happens here when use_tls is set
+            if self.username:
+                await client.login(self.username, self.password)
+        except Exception as e:
+            client.close()
+            raise SMTPUnavailable(f"Cannot open SMTP session to {self.hostname}:{self.port}: {e}") from e
+        self.connects += 1
+
+    async def send(self, message: MIMEMultipart) -> None:
+        """
+        Send on an idle session, reconnecting once if the server dropped it
+        Raises the SMTP error if the message is refused, SMTPUnavailable if no session can be had
+        """
+        client = await self._idle.get()
+        try:
+            if not client.is_connected:
+                await self._connect(client)
+            try:
+                await client.send_message(message)
+            except RECONNECT_ERRORS as e:
+                logger.warning(f"SMTP session to {self.hostname}:{self.port} dropped ({e}); reconnecting")
+                await self._connect(client)
+                await client.send_message(message)
+        except RECONNECT_ERRORS as e:
+            raise SMTPUnavailable(f"SMTP session to {self.hostname}:{self.port} keeps dropping: {e}") from e
+        finally:
+            self._idle.put_nowait(client)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client.is_connected:
+                try:
+                    await client.quit()
+                except Exception:
+                    client.close()
+
+
+class LeaseLost(Exception):
+    """Another sender took over the campaign (our lease expired)"""
+
+
+class CampaignService:
+    """Newsletter campaign creation, sending and progress"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.campaigns = db.newsletter_campaigns
+        self.deliveries = db.campaign_deliveries
+
+    async def create_campaign(self, campaign_data: NewsletterCampaignCreate) -> NewsletterCampaign:
+        """Store a draft campaign (templates are compiled here so syntax errors surface early)"""
+        context = self._campaign_context(campaign_data.name)
+        CampaignTemplate(campaign_data.html_template, context, escape=True)
+        if campaign_data.text_template:
+            CampaignTemplate(campaign_data.text_template, context)
+
+        campaign = NewsletterCampaign(**campaign_data.model_dump())
+        await self.campaigns.insert_one(to_document(campaign))
+        return campaign
+
+    async def get_campaign(self, campaign_uid: UUID) -> Optional[NewsletterCampaign]:
+        doc = await self.campaigns.find_one({"uid": campaign_uid})
+        return from_document(NewsletterCampaign, doc) if doc else None
+
+    async def get_progress(self, campaign_uid: UUID) -> Optional[Dict[str, Any]]:
+        """Campaign status plus delivery counts from the checkpoints"""
+        campaign = await self.get_campaign(campaign_uid)
+        if campaign is None:
+            return None
+        counts = {DELIVERY_SENT: 0, DELIVERY_REJECTED: 0, DELIVERY_FAILED: 0}
+        async for row in self.deliveries.aggregate([
+            {"$match": {"campaign_uid": campaign_uid}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]):
+            counts[row["_id"]] = row["count"]
+        return {
+            "uid": str(campaign.uid),
+            "name": campaign.name,
+            "status": campaign.status.value,
+            "started_at": campaign.started_at.isoformat() if campaign.started_at else None,
+            "completed_at": campaign.completed_at.isoformat() if campaign.completed_at else None,
+            **counts
+        }
+
+    # ---------- sending ----------
+
+    @staticmethod
+    def _campaign_context(name: str) -> Dict[str, Any]:
+        return {
+            "campaign_name": name,
+            "website_url": settings.FRONTEND_URL or "http://localhost:5173",
+            "year": datetime.utcnow().year
+        }
+
+    @staticmethod
+    def _unsubscribe_url(email: str) -> str:
+        frontend_url = settings.FRONTEND_URL or "http://localhost:5173"
+        return f"{frontend_url}/newsletter/unsubscribe?email={quote(email)}"
+
+    async def claim_campaign(self, campaign_uid: UUID) -> Optional[NewsletterCampaign]:
+        """
+        Take the sending lease on a campaign that is not completed and not being
+        sent (or whose sender stopped renewing its lease); None if unavailable
+        """
+        now = datetime.utcnow()
+        doc = await self.campaigns.find_one_and_update(
+            {
+                "uid": campaign_uid,
+                "status": {"$ne": NewsletterCampaignStatus.COMPLETED.value},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            [{"$set": {
+                "status": NewsletterCampaignStatus.SENDING.value,
+                "lease_until": now + timedelta(seconds=settings.CAMPAIGN_LEASE_SECONDS),
+                "started_at": {"$ifNull": ["$started_at", now]}
+            }}],
+            return_document=ReturnDocument.AFTER
+        )
+        return from_document(NewsletterCampaign, doc) if doc else None
+
+    async def _renew_lease(self, campaign: NewsletterCampaign) -> None:
+        """Extend our lease; the current lease_until doubles as the ownership token"""
+        lease_until = datetime.utcnow() + timedelta(seconds=settings.CAMPAIGN_LEASE_SECONDS)
+        result = await self.campaigns.update_one(
+            {"uid": campaign.uid, "lease_until": campaign.lease_until},
+            {"$set": {"lease_until": lease_until}}
+        )
+        if not result.modified_count:
+            raise LeaseLost(f"Campaign {campaign.uid} was taken over by another sender")
+        campaign.lease_until = lease_until
+
+    async def _hold_lease(self, campaign: NewsletterCampaign) -> None:
+        while True:
+            await asyncio.sleep(settings.CAMPAIGN_LEASE_SECONDS / 3)
+            await self._renew_lease(campaign)
+
+    async def _release(self, campaign: NewsletterCampaign, status: NewsletterCampaignStatus) -> None:
+        update: Dict[str, Any] = {"status": status.value, "lease_until": None}
+        if status == NewsletterCampaignStatus.COMPLETED:
+            update["completed_at"] = datetime.utcnow()
+        await self.campaigns.update_one(
+            {"uid": campaign.uid, "lease_until": campaign.lease_until}, {"$set": update}
+        )
+
+    def _build_message(
+        self,
+        campaign: NewsletterCampaign,
+        html_template: CampaignTemplate,
+        text_template: Optional[CampaignTemplate],
+        email: str,
+        sender: str
+    ) -> MIMEMultipart:
+        values = (email, self._unsubscribe_url(email))
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = campaign.subject
+        msg['From'] = sender
+        msg['To'] = email
+        msg['List-Unsubscribe'] = f"<{values[1]}>"
+        if text_template:
+            msg.attach(MIMEText(text_template.personalize(values), 'plain'))
+        msg.attach(MIMEText(html_template.personalize(values), 'html'))
+        return msg
+
+    async def _deliver(
+        self,
+        campaign: NewsletterCampaign,
+        msg: MIMEMultipart,
+        email: str,
+        pool: SMTPPool,
+        bucket: TokenBucket
+    ) -> str:
+        """
+        Send one message and checkpoint its outcome; returns the delivery status
+        SMTPUnavailable propagates unrecorded, so the recipient is retried on resume
+        """
+        error = None
+        await bucket.acquire()
+        try:
+            await pool.send(msg)
+            status = DELIVERY_SENT
+        except SMTPUnavailable:
+            raise
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            status, error = DELIVERY_REJECTED, str(e)
+        except aiosmtplib.SMTPResponseException as e:
+            # 5xx is permanent for this recipient; 4xx is worth retrying on resume
+            status = DELIVERY_REJECTED if e.code >= 500 else DELIVERY_FAILED
+            error = str(e)
+        except Exception as e:
+            status, error = DELIVERY_FAILED, str(e)
+
+        now = datetime.utcnow()
+        await self.deliveries.update_one(
+            {"campaign_uid": campaign.uid, "email": email},
+            {
+                "$set": {"status": status, "error": error, "updated_at": now},
+                "$setOnInsert": {"created_at": now},
+                "$inc": {"attempts": 1}
+            },
+            upsert=True
+        )
+        return status
+
+    async def deliver_campaign(self, campaign: NewsletterCampaign) -> Dict[str, Any]:
+        """
+        Mail every active subscriber of a claimed campaign, skipping recipients
+        already checkpointed as sent/rejected. Subscribers are paged by _id keyset
+        and each page fans out over the SMTP pool
+        """
+        context = self._campaign_context(campaign.name)
+        html_template = CampaignTemplate(campaign.html_template, context, escape=True)
+        text_template = (
+            CampaignTemplate(campaign.text_template, context) if campaign.text_template else None
+        )
+        from_email = settings.FROM_EMAIL or settings.SMTP_USERNAME
+        sender = f"{settings.FROM_NAME or 'Dbanyan Group'} <{from_email}>"
+
+        pool = SMTPPool(
+            settings.CAMPAIGN_SMTP_POOL_SIZE,
+            settings.SMTP_SERVER or "localhost",
+            settings.SMTP_PORT,
+            settings.SMTP_USERNAME or None,
+            settings.SMTP_PASSWORD or None,
+            settings.SMTP_USE_TLS
+        )
+        bucket = TokenBucket(settings.CAMPAIGN_RATE_PER_SECOND, settings.CAMPAIGN_RATE_BURST)
+        counts = {DELIVERY_SENT: 0, DELIVERY_REJECTED: 0, DELIVERY_FAILED: 0, "skipped": 0}
+        lease_task = asyncio.create_task(self._hold_lease(campaign))
+        newsletter_service = NewsletterService(self.db)
+        final_status = NewsletterCampaignStatus.FAILED
+        owned = True
+
+        try:
+            async for page in newsletter_service.iter_subscribers(projection={"email": 1}):
+                if lease_task.done():
+                    lease_task.result()  # re-raise LeaseLost / renewal errors
+
+                emails = [doc["email"] for doc in page]
+                done = {
+                    doc["email"] async for doc in self.deliveries.find(
+                        {
+                            "campaign_uid": campaign.uid,
+                            "email": {"$in": emails},
+                            "status": {"$in": FINAL_DELIVERY_STATUSES}
+                        },
+                        {"_id": 0, "email": 1}
+                    )
+                }
+                counts["skipped"] += len(done)
+
+                # return_exceptions: let every in-flight send finish and checkpoint before stopping
+                outcomes = await asyncio.gather(*(
+                    self._deliver(
+                        campaign,
+                        self._build_message(campaign, html_template, text_template, email, sender),
+                        email, pool, bucket
+                    )
+                    for email in emails if email not in done
+                ), return_exceptions=True)
+                errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+                for outcome in outcomes:
+                    if not isinstance(outcome, BaseException):
+                        counts[outcome] += 1
+                if errors:
+                    raise errors[0]
+
+            if lease_task.done():
+                lease_task.result()
+            # Transient failures leave the campaign resumable so a re-send retries them
+            if not counts[DELIVERY_FAILED]:
+                final_status = NewsletterCampaignStatus.COMPLETED
+        except LeaseLost as e:
+            owned = False
+            logger.warning(str(e))
+            return {"success": False, "message": str(e), **counts}
+        except Exception as e:
+            logger.error(f"Campaign {campaign.uid} stopped: {e}")
+            return {"success": False, "message": f"Campaign stopped: {e}", **counts}
+        finally:
+            lease_task.cancel()
+            await pool.close()
+            if owned:
+                await self._release(campaign, final_status)
+
+        logger.info(
+            f"Campaign {campaign.uid}: {counts[DELIVERY_SENT]} sent, {counts[DELIVERY_REJECTED]} rejected, "
+            f"{counts[DELIVERY_FAILED]} failed, {counts['skipped']} already delivered "
+            f"over {pool.connects} SMTP connections"
+        )
+        message = "Campaign sent" if final_status == NewsletterCampaignStatus.COMPLETED else \
+            "Campaign sent with transient failures; send again to retry them"
+        return {"success": True, "message": message, **counts}
+
+    async def send_campaign(self, campaign_uid: UUID) -> Dict[str, Any]:
+        """Claim and deliver a campaign (resumes a failed or abandoned send)"""
+        campaign = await self.claim_campaign(campaign_uid)
+        if campaign is None:
+            return {"success": False, "message": "Campaign not found, already completed or being sent"}
+        return await self.deliver_campaign(campaign)
@@ -0,0 +1,269 @@
+# Dbanyan Group Backend - Checkout Admission Control
+# Virtual waiting room for flash sales: bounded concurrency, FIFO queue with
+# position tokens, a max-wait budget and per-SKU gating, so checkout throughput
+# holds steady under overload instead of stampeding MongoDB and Razorpay
+# State is per worker process; size limits accordingly
+
+import asyncio
+import hashlib
+import heapq
+import hmac
+import itertools
+import math
+import secrets
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+
+class AdmissionRejected(Exception):
+    """Checkout could not be admitted within the wait budget"""
+
+    def __init__(self, reason: str, retry_after: int, token: str, position: Optional[int] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.token = token
+        self.position = position
+
+
+class CheckoutAdmissionController:
+    """Admits at most max_concurrency checkouts at once; the rest wait in ticket order"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        max_wait_seconds: float,
+        sku_max_concurrency: int = 0,
+        token_ttl_seconds: int = 600,
+        secret: str = ""
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.sku_max_concurrency = sku_max_concurrency
+        self.token_ttl_seconds = token_ttl_seconds
+        self._secret = secret.encode()
+        self._worker_id = secrets.token_hex(4)  # tokens only place clients on the worker that issued them
+        self._issued: Dict[str, int] = {}  # unused token nonce -> ticket
+        self._issued_expiry: deque = deque()  # (expires_at, nonce) in issue order
+
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # (ticket, seq, future) min-heap
+        self._queued = 0  # live waiters; abandoned futures stay in the heap until popped
+        self._tickets = itertools.count(1)
+        self._seq = itertools.count()
+        self._sku_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._sku_users: Dict[str, int] = {}
+
+        self._admitted_total = 0
+        self._rejected_total = 0
+        self._recent_admits: deque = deque()
+
+    # ---------- position tokens ----------
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._secret, payload.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def _prune_issued(self) -> None:
+        now = time.time()
+        while self._issued_expiry and self._issued_expiry[0][0] <= now:
+            _, nonce = self._issued_expiry.popleft()
+            self._issued.pop(nonce, None)
+
+    def _issue_token(self, ticket: int) -> str:
+        self._prune_issued()
+        nonce = secrets.token_hex(8)
+        issued_at = int(time.time())
+        self._issued[nonce] = ticket
+        self._issued_expiry.append((issued_at + self.token_ttl_seconds, nonce))
+        payload = f"{self._worker_id}.{ticket}.{nonce}.{issued_at}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def _ticket_from_token(self, token: Optional[str]) -> Optional[int]:
+        """
+        Returning clients keep their original place in line
+        Each token is good for one retry on the worker that issued it; a rejected
+        retry hands out a fresh token for the same ticket
+        """
+        if not token:
+            return None
+        self._prune_issued()
+        try:
+            worker_id, ticket, nonce, issued_at, signature = token.split(".")
+            payload = f"{worker_id}.{ticket}.{nonce}.{issued_at}"
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            if worker_id != self._worker_id or self._issued.get(nonce) != int(ticket):
+                return None
+            if time.time() - int(issued_at) > self.token_ttl_seconds:
+                return None
+            del self._issued[nonce]
+            return int(ticket)
+        except ValueError:
+            return None
+
+    # ---------- global slots ----------
+
+    def _record_admit(self) -> None:
+        now = time.monotonic()
+        self._admitted_total += 1
+        self._recent_admits.append(now)
+        while self._recent_admits and now - self._recent_admits[0] > 10:
+            self._recent_admits.popleft()
+
+    def _admit_rate(self) -> float:
+        """Admissions per second over the last 10 seconds"""
+        now = time.monotonic()
+        while self._recent_admits and now - self._recent_admits[0] > 10:
+            self._recent_admits.popleft()
+        return len(self._recent_admits) / 10
+
+    def _retry_after(self, position: int) -> int:
+        rate = self._admit_rate()
+        estimate = position / rate if rate else self.max_wait_seconds
+        return max(1, min(60, math.ceil(estimate)))
+
+    def _position(self, ticket: int) -> int:
+        return sum(1 for waiting_ticket, _, future in self._waiters
+                   if waiting_ticket < ticket and not future.done()) + 1
+
+    def _reject(self, reason: str, ticket: int, position: int) -> AdmissionRejected:
+        self._rejected_total += 1
+        return AdmissionRejected(reason, self._retry_after(position), self._issue_token(ticket), position)
+
+    async def _acquire(self, ticket: int, deadline: float) -> None:
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            return
+
+        if self._queued >= self.max_queue:
+            raise self._reject("Checkout queue is full", ticket, self._queued + 1)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (ticket, next(self._seq), future))
+        self._queued += 1
+        try:
+            await asyncio.wait({future}, timeout=max(0, deadline - time.monotonic()))
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot handed to us, or leave the line
+            if future.done():
+                self._release()
+            else:
+                self._queued -= 1
+                future.cancel()
+            raise
+
+        if future.done():
+            return  # slot was handed over by _release
+
+        position = self._position(ticket)
+        self._queued -= 1
+        future.cancel()
+        raise self._reject("Checkout wait budget exceeded", ticket, position)
+
+    def _release(self) -> None:
+        """Hand the slot to the lowest waiting ticket, or free it"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    # ---------- per-SKU gating ----------
+
+    async def _acquire_skus(self, skus: List[str], deadline: float) -> List[str]:
+        """
+        Limit concurrent checkouts per SKU; returns the SKUs held
+        On timeout or cancellation everything taken so far is given back
+        """
+        held: List[str] = []
+        if not self.sku_max_concurrency:
+            return held
+        try:
+            for sku in skus:  # sorted by caller, so no lock-order deadlocks
+                semaphore = self._sku_semaphores.setdefault(
+                    sku, asyncio.Semaphore(self.sku_max_concurrency)
+                )
+                self._sku_users[sku] = self._sku_users.get(sku, 0) + 1
+                try:
+                    await asyncio.wait_for(
+                        semaphore.acquire(), timeout=max(0, deadline - time.monotonic())
+                    )
+                except BaseException:
+                    self._drop_sku_user(sku)
+                    raise
+                held.append(sku)
+            return held
+        except BaseException:
+            self._release_skus(held)
+            raise
+
+    def _drop_sku_user(self, sku: str) -> None:
+        self._sku_users[sku] -= 1
+        if not self._sku_users[sku]:
+            del self._sku_users[sku]
+            del self._sku_semaphores[sku]
+
+    def _release_skus(self, skus: Iterable[str]) -> None:
+        for sku in skus:
+            self._sku_semaphores[sku].release()
+            self._drop_sku_user(sku)
+
+    # ---------- public API ----------
+
+    @asynccontextmanager
+    async def admit(self, skus: Iterable[Any], token: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Hold SKU slots, then a checkout slot, for the duration of the block
+        SKU gates come first so waiters on a hot item never occupy a global slot
+        """
+        ticket = self._ticket_from_token(token) or next(self._tickets)
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        try:
+            held = await self._acquire_skus(sorted({str(sku) for sku in skus}), deadline)
+        except asyncio.TimeoutError:
+            raise self._reject("Item is in high demand", ticket, 1)
+        try:
+            await self._acquire(ticket, deadline)
+        except BaseException:
+            self._release_skus(held)
+            raise
+
+        self._record_admit()
+        try:
+            yield
+        finally:
+            self._release_skus(held)
+            self._release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot for dashboards and autoscaling"""
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self._queued,
+            "max_queue": self.max_queue,
+            "admitted_total": self._admitted_total,
+            "rejected_total": self._rejected_total,
+            "admit_rate_per_sec": self._admit_rate(),
+            "gated_skus": dict(self._sku_users)
+        }
+
+
+# Global checkout admission controller instance
+checkout_admission = CheckoutAdmissionController(
+    max_concurrency=settings.CHECKOUT_MAX_CONCURRENCY,
+    max_queue=settings.CHECKOUT_MAX_QUEUE,
+    max_wait_seconds=settings.CHECKOUT_MAX_WAIT_SECONDS,
+    sku_max_concurrency=settings.CHECKOUT_SKU_MAX_CONCURRENCY,
+    token_ttl_seconds=settings.CHECKOUT_TOKEN_TTL_SECONDS,
+    secret=settings.JWT_SECRET_KEY
+)
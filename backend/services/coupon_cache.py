@@ -0,0 +1,76 @@
+# Dbanyan Group Backend - Coupon Cache
+# App-scoped read-through cache for coupon lookups by code. The active coupon set is
+# tiny and rarely changes, so validation (every keystroke in the coupon box and every
+# checkout) is served from memory. Unknown codes are cached negatively
+# Per worker process: writes invalidate locally, other workers converge within the TTL
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from config import settings
+from models import Coupon
+
+
+def normalize_code(code: str) -> str:
+    """Canonical coupon code (codes are case-insensitive)"""
+    return code.strip().upper()
+
+
+class CouponCache:
+    """LRU-bounded map of code -> (coupon or None, monotonic expiry)"""
+
+    def __init__(self, ttl_seconds: int, negative_ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[Coupon], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, code: str) -> Tuple[bool, Optional[Coupon]]:
+        """(hit, coupon); a hit with None means the code is known not to exist"""
+        key = normalize_code(code)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def put(self, code: str, coupon: Optional[Coupon]) -> None:
+        """Cache a lookup result; live coupons never outlive their expires_at"""
+        if coupon is None:
+            ttl = self.negative_ttl_seconds
+        else:
+            ttl = self.ttl_seconds
+            until_expiry = (coupon.expires_at - datetime.utcnow()).total_seconds()
+            if until_expiry > 0:
+                ttl = min(ttl, until_expiry)
+
+        key = normalize_code(code)
+        self._entries[key] = (coupon, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, code: str) -> None:
+        self._entries.pop(normalize_code(code), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global coupon cache instance
+coupon_cache = CouponCache(
+    ttl_seconds=settings.COUPON_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.COUPON_NEGATIVE_CACHE_TTL_SECONDS,
+    max_entries=settings.COUPON_CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,191 @@
+# Dbanyan Group Backend - Coupon Guessing Guard
+# A Bloom filter of every coupon code answers "definitely not a coupon" from memory,
+# so brute-force guesses never reach MongoDB, and a per-client failure counter
+# slows (then blocks) clients that keep guessing
+# Per worker process: the filter is built at startup and topped up from coupons
+# created since the last refresh, so codes made on other workers appear within the interval
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from config import settings
+from services.coupon_cache import normalize_code
+
+logger = logging.getLogger(__name__)
+
+# Re-scan this far behind the last refresh so inserts that landed late are not missed
+REFRESH_OVERLAP = timedelta(minutes=2)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing from one BLAKE2b digest)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class CouponGuard:
+    """Bloom filter of coupon codes plus per-client failed-attempt throttling"""
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        free_attempts: int,
+        base_delay: float,
+        block_after_seconds: float,
+        window_seconds: int,
+        max_clients: int = 100_000
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.free_attempts = free_attempts
+        self.base_delay = base_delay
+        self.block_after_seconds = block_after_seconds
+        self.window_seconds = window_seconds
+        self.max_clients = max_clients
+
+        self._filter: Optional[BloomFilter] = None
+        self._refreshed_at: Optional[datetime] = None
+        self._failures: Dict[str, Tuple[int, float]] = {}  # client -> (failures, window start)
+        self.rejected_total = 0
+
+    # ---------- Bloom filter ----------
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    async def build(self, db: AsyncIOMotorDatabase) -> None:
+        """Load every coupon code (call once from app startup)"""
+        started = datetime.utcnow()
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        async for doc in db.coupons.find({}, {"_id": 0, "code": 1}).batch_size(10_000):
+            bloom.add(normalize_code(doc["code"]))
+        self._filter = bloom
+        self._refreshed_at = started
+        if bloom.count > self.capacity:
+            logger.warning(f"Coupon Bloom filter over capacity ({bloom.count} codes); raise COUPON_BLOOM_CAPACITY")
+        logger.info(f"Coupon Bloom filter built with {bloom.count} codes")
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> None:
+        """Add coupons created since the last refresh (on any worker)"""
+        if self._filter is None:
+            await self.build(db)
+            return
+        started = datetime.utcnow()
+        async for doc in db.coupons.find(
+            {"created_at": {"$gte": self._refreshed_at - REFRESH_OVERLAP}}, {"_id": 0, "code": 1}
+        ):
+            self._filter.add(normalize_code(doc["code"]))
+        self._refreshed_at = started
+
+    def add(self, codes: Iterable[str]) -> None:
+        """Record new codes (before they are inserted, so there is no false-negative window)"""
+        if self._filter is not None:
+            for code in codes:
+                self._filter.add(normalize_code(code))
+
+    def might_exist(self, code: str) -> bool:
+        """False only if the code is definitely not a coupon; True while the filter is not built"""
+        if self._filter is None:
+            return True
+        if normalize_code(code) in self._filter:
+            return True
+        self.rejected_total += 1
+        return False
+
+    # ---------- guess throttling ----------
+
+    def delay_for(self, client: str) -> float:
+        """Seconds to hold this client's next attempt (0 while under free_attempts)"""
+        entry = self._failures.get(client)
+        if entry is None:
+            return 0.0
+        failures, window_start = entry
+        if time.monotonic() - window_start > self.window_seconds:
+            del self._failures[client]
+            return 0.0
+        excess = failures - self.free_attempts
+        return 0.0 if excess < 0 else self.base_delay * 2 ** min(excess, 16)
+
+    def is_blocked(self, client: str) -> bool:
+        return self.delay_for(client) >= self.block_after_seconds
+
+    def record_failure(self, client: str) -> None:
+        now = time.monotonic()
+        failures, window_start = self._failures.get(client, (0, now))
+        if now - window_start > self.window_seconds:
+            failures, window_start = 0, now
+        self._failures[client] = (failures + 1, window_start)
+        if len(self._failures) > self.max_clients:
+            self._prune(now)
+
+    def record_success(self, client: str) -> None:
+        self._failures.pop(client, None)
+
+    def _prune(self, now: float) -> None:
+        expired = [client for client, (_, start) in self._failures.items()
+                   if now - start > self.window_seconds]
+        for client in expired:
+            del self._failures[client]
+        # Still full: drop the oldest windows
+        overflow = len(self._failures) - self.max_clients
+        if overflow > 0:
+            for client, _ in sorted(self._failures.items(), key=lambda item: item[1][1])[:overflow]:
+                del self._failures[client]
+
+    def metrics(self) -> dict:
+        return {
+            "codes": self._filter.count if self._filter else 0,
+            "bloom_rejections": self.rejected_total,
+            "throttled_clients": len(self._failures)
+        }
+
+
+async def run_coupon_guard_refresher(db: AsyncIOMotorDatabase) -> None:
+    """Background loop: build the filter, then top it up periodically"""
+    while True:
+        try:
+            await coupon_guard.refresh(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Coupon Bloom filter refresh failed: {e}")
+        await asyncio.sleep(settings.COUPON_BLOOM_REFRESH_SECONDS)
+
+
+# Global coupon guard instance
+coupon_guard = CouponGuard(
+    capacity=settings.COUPON_BLOOM_CAPACITY,
+    error_rate=settings.COUPON_BLOOM_ERROR_RATE,
+    free_attempts=settings.COUPON_GUESS_FREE_ATTEMPTS,
+    base_delay=settings.COUPON_GUESS_BASE_DELAY_SECONDS,
+    block_after_seconds=settings.COUPON_GUESS_BLOCK_DELAY_SECONDS,
+    window_seconds=settings.COUPON_GUESS_WINDOW_SECONDS
+)
@@ -2,16 +2,28 @@
 # Implementing project_context.md Section 2.4: Coupon code functionality - FR4.3
 
 import logging
-from typing import Optional, Dict, Any
-from uuid import UUID
+import random
+from typing import Optional, Dict, Any, AsyncIterator
+from uuid import UUID, uuid4
 from datetime import datetime
 from decimal import Decimal
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models import Coupon, CouponCreate, CouponType
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from models import (
+    Coupon, CouponCampaign, CouponCampaignCreate, CouponCampaignStatus, CouponCreate, CouponType, OrderStatus
+)
+from codec import to_document, from_document
+from config import settings
+from services.coupon_cache import coupon_cache, normalize_code
+from services.coupon_codes import CodePermutation, format_coupon_code
+from services.coupon_guard import coupon_guard
 
 logger = logging.getLogger(__name__)
 
+COUPON_NOT_FOUND = "Coupon not found"
+
 
 class CouponService:
     """Business logic for coupon management"""
@@ -19,13 +31,20 @@ class CouponService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.collection = db.coupons
+        self.counters = db.coupon_counters
+        self.campaigns = db.coupon_campaigns
+        self.redemptions = db.coupon_redemptions
     
     async def create_coupon(self, coupon_data: CouponCreate) -> Coupon:
         """Create a new coupon"""
         try:
-            coupon = Coupon(**coupon_data.model_dump())
+            coupon = Coupon(**{**coupon_data.model_dump(), "code": normalize_code(coupon_data.code)})
             
-            await self.collection.insert_one(coupon.model_dump(mode='json'))
+            coupon_guard.add([coupon.code])
+            await self.collection.insert_one(to_document(coupon))
+            if coupon.redemption_shards > 1:
+                await self.counters.insert_many(self._shard_documents(coupon))
+            coupon_cache.invalidate(coupon.code)  # drop any negative entry
             
             logger.info(f"Coupon created: {coupon.code}")
             return coupon
@@ -34,14 +53,127 @@ class CouponService:
             logger.error(f"Error creating coupon: {e}")
             raise
     
+    async def create_campaign(self, campaign_data: CouponCampaignCreate) -> CouponCampaign:
+        """
+        Record a bulk-code campaign and lease its block of the global coupon_code
+        counter in one $inc; the codes themselves are made by generate_campaign_codes
+        """
+        counter = await self.db.counters.find_one_and_update(
+            {"_id": "coupon_code"},
+            {"$inc": {"value": campaign_data.quantity}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        campaign = CouponCampaign(
+            **campaign_data.model_dump(),
+            first_value=counter["value"] - campaign_data.quantity
+        )
+        await self.campaigns.insert_one(to_document(campaign))
+        return campaign
+    
+    async def get_campaign(self, campaign_uid: UUID) -> Optional[CouponCampaign]:
+        doc = await self.campaigns.find_one({"uid": campaign_uid})
+        return from_document(CouponCampaign, doc) if doc else None
+    
+    async def generate_campaign_codes(self, campaign_uid: UUID) -> Dict[str, Any]:
+        """
+        Generate and insert a campaign's codes, resuming after the last finished chunk
+        Each counter value in the leased block is permuted into a code, so codes never
+        collide with each other or with earlier campaigns, and a re-run reproduces the
+        same codes: chunks that were inserted before a crash are simply rejected by the
+        unique index. Progress is recorded per chunk; memory is bounded by the chunk size
+        """
+        campaign = await self.get_campaign(campaign_uid)
+        if campaign is None:
+            return {"success": False, "message": "Campaign not found"}
+        if campaign.status == CouponCampaignStatus.COMPLETED:
+            return {"success": True, "message": "Campaign already generated", "generated": campaign.generated}
+        
+        permutation = CodePermutation(settings.JWT_SECRET_KEY.encode())
+        template = to_document(Coupon(
+            code="CAMPAIGN",
+            campaign_id=campaign.uid,
+            **campaign.model_dump(include={
+                "description", "coupon_type", "value", "minimum_order_amount",
+                "maximum_discount_amount", "usage_limit", "expires_at"
+            })
+        ))
+        chunk_size = settings.COUPON_BULK_CHUNK_SIZE
+        
+        try:
+            await self.campaigns.update_one(
+                {"uid": campaign.uid}, {"$set": {"status": CouponCampaignStatus.GENERATING.value}}
+            )
+            for chunk_start in range(campaign.next_index, campaign.quantity, chunk_size):
+                chunk_end = min(chunk_start + chunk_size, campaign.quantity)
+                codes = [
+                    format_coupon_code(campaign.code_prefix, permutation.permute(campaign.first_value + i))
+                    for i in range(chunk_start, chunk_end)
+                ]
+                now = datetime.utcnow()  # per chunk, so the Bloom refresh watermark sees late chunks
+                documents = [{**template, "uid": uuid4(), "code": code, "created_at": now} for code in codes]
+                coupon_guard.add(codes)
+                
+                try:
+                    await self.collection.insert_many(documents, ordered=False)
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors", [])
+                    if any(error.get("code") != 11000 for error in errors):
+                        raise
+                    # Codes from an interrupted run, or (rarely) clashing hand-made codes
+                    logger.warning(f"Campaign {campaign.uid}: {len(errors)} codes already present")
+                for code in codes:
+                    coupon_cache.invalidate(code)  # drop negative entries for the new codes
+                
+                await self.campaigns.update_one(
+                    {"uid": campaign.uid}, {"$set": {"next_index": chunk_end}}
+                )
+        except Exception as e:
+            await self.campaigns.update_one(
+                {"uid": campaign.uid}, {"$set": {"status": CouponCampaignStatus.FAILED.value}}
+            )
+            logger.error(f"Campaign {campaign.uid}: code generation stopped: {e}")
+            return {"success": False, "message": f"Code generation stopped: {e}"}
+        
+        generated = await self.collection.count_documents({"campaign_id": campaign.uid})
+        await self.campaigns.update_one(
+            {"uid": campaign.uid},
+            {"$set": {
+                "status": CouponCampaignStatus.COMPLETED.value,
+                "generated": generated,
+                "completed_at": datetime.utcnow()
+            }}
+        )
+        logger.info(f"Campaign {campaign.uid}: generated {generated}/{campaign.quantity} codes")
+        return {"success": True, "message": "Campaign generated", "generated": generated}
+    
+    async def export_campaign_codes(self, campaign_uid: UUID) -> AsyncIterator[str]:
+        """Stream a campaign's codes as CSV"""
+        chunk_size = settings.COUPON_BULK_CHUNK_SIZE
+        rows = ["code"]
+        async for doc in self.collection.find(
+            {"campaign_id": campaign_uid}, {"_id": 0, "code": 1}
+        ).batch_size(chunk_size):
+            rows.append(doc["code"])
+            if len(rows) >= chunk_size:
+                yield "\n".join(rows) + "\n"
+                rows = []
+        if rows:
+            yield "\n".join(rows) + "\n"
+    
     async def get_coupon_by_code(self, code: str) -> Optional[Coupon]:
-        """Get coupon by code"""
+        """Get coupon by code (served from the coupon cache when possible)"""
         try:
-            coupon_doc = await self.collection.find_one({"code": code.upper()})
-            if coupon_doc:
-                coupon_doc['uid'] = UUID(coupon_doc['uid'])
-                return Coupon(**coupon_doc)
-            return None
+            hit, coupon = coupon_cache.get(code)
+            if hit:
+                return coupon
+            if not coupon_guard.might_exist(code):
+                return None  # definitely not a coupon: no database round trip
+            
+            coupon_doc = await self.collection.find_one({"code": normalize_code(code)})
+            coupon = from_document(Coupon, coupon_doc) if coupon_doc else None
+            coupon_cache.put(code, coupon)
+            return coupon
             
         except Exception as e:
             logger.error(f"Error fetching coupon {code}: {e}")
@@ -55,7 +187,7 @@ class CouponService:
             if not coupon:
                 return {
                     "valid": False,
-                    "message": "Coupon not found"
+                    "message": COUPON_NOT_FOUND
                 }
             
             # Check if coupon is active
@@ -131,11 +263,164 @@ class CouponService:
             logger.error(f"Error applying coupon {code}: {e}")
             raise
     
+    @staticmethod
+    def _shard_documents(coupon: Coupon) -> list:
+        """Counter shards for a hot coupon; shard limits sum to usage_limit"""
+        shards = coupon.redemption_shards
+        documents = []
+        for shard in range(shards):
+            limit = None
+            if coupon.usage_limit is not None:
+                limit = coupon.usage_limit // shards + (1 if shard < coupon.usage_limit % shards else 0)
+            documents.append({
+                "_id": f"{coupon.uid}:{shard}",
+                "coupon_uid": coupon.uid,
+                "shard": shard,
+                "count": 0,
+                "limit": limit,
+                "is_active": True,
+                "expires_at": coupon.expires_at
+            })
+        return documents
+    
+    @staticmethod
+    def _redeemable(count_field: str, limit_field: str) -> Dict[str, Any]:
+        """Filter: active, not expired and under the usage limit (no limit = unlimited)"""
+        return {
+            "is_active": True,
+            "expires_at": {"$gt": datetime.utcnow()},
+            "$expr": {"$or": [
+                {"$eq": [{"$ifNull": [f"${limit_field}", None]}, None]},
+                {"$lt": [f"${count_field}", f"${limit_field}"]}
+            ]}
+        }
+    
+    async def _is_first_order(self, customer_email: str) -> bool:
+        """
+        One round trip: any placed order, live or archived, via the customer_email indexes
+        Unpaid online checkouts don't count, so a customer retrying a failed payment keeps
+        their first-order coupon: they stay PENDING until paid and the sweeper cancels them
+        when their payment expires (COD orders are confirmed at creation, so they still count)
+        """
+        match = {"$match": {
+            "customer_email": customer_email,
+            "status": {"$nin": [OrderStatus.CANCELLED.value, OrderStatus.PENDING.value]}
+        }}
+        previous = await self.db.orders.aggregate([
+            match,
+            {"$limit": 1},
+            {"$unionWith": {"coll": "orders_archive", "pipeline": [match, {"$limit": 1}]}},
+            {"$limit": 1},
+            {"$project": {"_id": 1}}
+        ]).to_list(length=1)
+        return not previous
+    
+    async def _record_redemption(self, coupon: Coupon, customer_email: str, order_uid: UUID) -> bool:
+        """
+        Ledger upsert keyed by the unique (coupon_uid, customer_email) index
+        When the customer is at per_customer_limit the filter misses, the upsert
+        collides with their existing entry and the duplicate key rejects it
+        """
+        query: Dict[str, Any] = {"coupon_uid": coupon.uid, "customer_email": customer_email}
+        if coupon.per_customer_limit:
+            query["count"] = {"$lt": coupon.per_customer_limit}
+        now = datetime.utcnow()
+        update = {
+            "$inc": {"count": 1},
+            "$push": {"order_uids": order_uid},
+            "$set": {"last_redeemed_at": now},
+            "$setOnInsert": {"first_redeemed_at": now}
+        }
+        
+        for _ in range(2):  # a concurrent first redemption can make the upsert collide once
+            try:
+                await self.redemptions.update_one(query, update, upsert=True)
+                return True
+            except DuplicateKeyError:
+                continue
+        return False
+    
+    async def redeem(self, coupon: Coupon, customer_email: str, order_uid: UUID) -> Dict[str, Any]:
+        """
+        Atomically take one use of a coupon for a customer's order
+        Per-customer rules cost one ledger upsert (plus one lookup for
+        first_order_only); the global limit is a single conditional update, so
+        both hold under concurrency. Hot coupons spread uses over counter shards,
+        probing from a random shard so writers rarely contend on one document
+        Returns {"redeemed", "shard", "message"}; shard is None when counted on the coupon itself
+        """
+        try:
+            if coupon.first_order_only and not await self._is_first_order(customer_email):
+                return {"redeemed": False, "shard": None, "message": "Coupon is valid on first orders only"}
+            
+            customer_email = customer_email.lower()  # ledger key
+            if not await self._record_redemption(coupon, customer_email, order_uid):
+                return {"redeemed": False, "shard": None, "message": "Coupon already used the maximum number of times"}
+            
+            if coupon.redemption_shards <= 1:
+                result = await self.collection.update_one(
+                    {"uid": coupon.uid, **self._redeemable("usage_count", "usage_limit")},
+                    {"$inc": {"usage_count": 1}}
+                )
+                if result.modified_count == 1:
+                    return {"redeemed": True, "shard": None, "message": "Coupon redeemed"}
+            else:
+                shards = coupon.redemption_shards
+                start = random.randrange(shards)
+                for offset in range(shards):
+                    shard = (start + offset) % shards
+                    result = await self.counters.update_one(
+                        {"_id": f"{coupon.uid}:{shard}", **self._redeemable("count", "limit")},
+                        {"$inc": {"count": 1}}
+                    )
+                    if result.modified_count == 1:
+                        return {"redeemed": True, "shard": shard, "message": "Coupon redeemed"}
+            
+            await self._remove_redemption(coupon.uid, customer_email, order_uid)
+            return {"redeemed": False, "shard": None, "message": "Coupon usage limit reached"}
+            
+        except Exception as e:
+            logger.error(f"Error redeeming coupon {coupon.code}: {e}")
+            raise
+    
+    async def _remove_redemption(self, coupon_uid: UUID, customer_email: str, order_uid: UUID) -> None:
+        """Drop one order from the ledger; matching on order_uids makes it idempotent"""
+        await self.redemptions.update_one(
+            {"coupon_uid": coupon_uid, "customer_email": customer_email.lower(), "order_uids": order_uid},
+            {"$inc": {"count": -1}, "$pull": {"order_uids": order_uid}}
+        )
+    
+    async def release(
+        self,
+        coupon_uid: UUID,
+        shard: Optional[int],
+        customer_email: str,
+        order_uid: UUID
+    ) -> bool:
+        """Give back a use taken by redeem (order cancelled or expired)"""
+        try:
+            await self._remove_redemption(coupon_uid, customer_email, order_uid)
+            if shard is None:
+                result = await self.collection.update_one(
+                    {"uid": coupon_uid, "usage_count": {"$gt": 0}},
+                    {"$inc": {"usage_count": -1}}
+                )
+            else:
+                result = await self.counters.update_one(
+                    {"_id": f"{coupon_uid}:{shard}", "count": {"$gt": 0}},
+                    {"$inc": {"count": -1}}
+                )
+            return result.modified_count == 1
+            
+        except Exception as e:
+            logger.error(f"Error releasing coupon {coupon_uid}: {e}")
+            raise
+    
     async def increment_usage_count(self, code: str) -> bool:
         """Increment coupon usage count"""
         try:
             result = await self.collection.update_one(
-                {"code": code.upper()},
+                {"code": normalize_code(code)},
                 {"$inc": {"usage_count": 1}}
             )
             return result.modified_count > 0
@@ -147,11 +432,17 @@ class CouponService:
     async def deactivate_coupon(self, uid: UUID) -> bool:
         """Deactivate a coupon"""
         try:
-            result = await self.collection.update_one(
-                {"uid": str(uid)},
-                {"$set": {"is_active": False}}
+            coupon_doc = await self.collection.find_one_and_update(
+                {"uid": uid, "is_active": True},
+                {"$set": {"is_active": False}},
+                projection={"code": 1},
+                return_document=ReturnDocument.AFTER
             )
-            return result.modified_count > 0
+            if not coupon_doc:
+                return False
+            await self.counters.update_many({"coupon_uid": uid}, {"$set": {"is_active": False}})
+            coupon_cache.invalidate(coupon_doc["code"])
+            return True
             
         except Exception as e:
             logger.error(f"Error deactivating coupon {uid}: {e}")
@@ -9,6 +9,7 @@ from email.mime.base import MIMEBase
 from email import encoders
 from jinja2 import Environment, DictLoader
 from typing import List, Optional
+from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -150,11 +151,62 @@ class EmailService:
                 </div>
             </body>
             </html>
+            """,
+            
+            'order_status_update': """
+            <html>
+            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                    <div style="text-align: center; margin-bottom: 30px;">
+                        <h1 style="color: #2C5F2D;">Order Update</h1>
+                        <img src="https://via.placeholder.com/150x50/2C5F2D/FFFFFF?text=DBANYAN" alt="Dbanyan Logo" style="margin: 20px 0;">
+                    </div>
+                    
+                    <h2 style="color: #2C5F2D;">Hello {{ name }}!</h2>
+                    
+                    <p>Your order <strong>{{ order_id }}</strong> is now <strong>{{ status }}</strong>.</p>
+                    
+                    {% if tracking_number %}
+                    <div style="background: #d4edda; border: 1px solid #c3e6cb; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                        <p style="margin: 0;"><strong>Tracking Number:</strong> {{ tracking_number }}</p>
+                    </div>
+                    {% endif %}
+                    
+                    <p>Thank you for choosing Dbanyan Group for your wellness journey!</p>
+                    <p><strong>The Dbanyan Group Team</strong></p>
+                    
+                    <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
+                    <p style="font-size: 12px; color: #666; text-align: center;">
+                        © {{ year }} Dbanyan Group. All rights reserved.<br>
+                        Premium Organic Moringa Products for Your Health
+                    </p>
+                </div>
+            </body>
+            </html>
             """
         }
         
         self.jinja_env = Environment(loader=DictLoader(self.templates))
     
+    def _build_message(
+        self,
+        to_email: str,
+        subject: str,
+        template_name: str,
+        template_data: dict,
+        to_name: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Render template into a MIME message"""
+        template = self.jinja_env.get_template(template_name)
+        html_body = template.render(**template_data)
+        
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = f"{to_name} <{to_email}>" if to_name else to_email
+        msg.attach(MIMEText(html_body, 'html'))
+        return msg
+    
     async def send_email(
         self, 
         to_email: str, 
@@ -169,19 +221,7 @@ class EmailService:
                 logger.error("SMTP credentials not configured")
                 return False
             
-            # Render template
-            template = self.jinja_env.get_template(template_name)
-            html_body = template.render(**template_data)
-            
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = f"{to_name} <{to_email}>" if to_name else to_email
-            
-            # Add HTML part
-            html_part = MIMEText(html_body, 'html')
-            msg.attach(html_part)
+            msg = self._build_message(to_email, subject, template_name, template_data, to_name)
             
             # Send email
             async with aiosmtplib.SMTP(hostname=self.smtp_server, port=self.smtp_port) as server:
@@ -196,6 +236,55 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    async def _open_session(self) -> aiosmtplib.SMTP:
+        server = aiosmtplib.SMTP(
+            hostname=self.smtp_server, port=self.smtp_port, start_tls=settings.SMTP_USE_TLS
+        )
+        await server.connect()  # upgrades with STARTTLS unless SMTP_USE_TLS is off
+        await server.login(self.smtp_username, self.smtp_password)
+        return server
+    
+    async def send_bulk_email(self, messages: List[MIMEMultipart]) -> int:
+        """
+        Send a batch of prepared messages over one SMTP session; returns the sent count
+        A refused message is logged and skipped; a dropped session is reopened and the
+        message retried once. Every recipient left unsent is logged
+        """
+        if not all([self.smtp_username, self.smtp_password]):
+            logger.error("SMTP credentials not configured")
+            return 0
+        
+        sent = 0
+        server = None
+        try:
+            for index, msg in enumerate(messages):
+                try:
+                    if server is None or not server.is_connected:
+                        server = await self._open_session()
+                    try:
+                        await server.send_message(msg)
+                    except aiosmtplib.SMTPServerDisconnected as e:
+                        logger.warning(f"SMTP session dropped ({str(e)}); reconnecting")
+                        server = await self._open_session()
+                        await server.send_message(msg)
+                    sent += 1
+                except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPResponseException) as e:
+                    logger.error(f"Email to {msg['To']} not sent: {str(e)}")
+                except Exception as e:
+                    # Cannot (re)open a session: nothing else in the batch can go out
+                    for unsent in messages[index:]:
+                        logger.error(f"Email to {unsent['To']} not sent: {str(e)}")
+                    break
+        finally:
+            if server is not None and server.is_connected:
+                try:
+                    await server.quit()
+                except Exception:
+                    server.close()
+        
+        logger.info(f"Bulk email sent {sent}/{len(messages)} messages")
+        return sent
+    
     async def send_welcome_email(self, to_email: str, name: str) -> bool:
         """Send welcome email to new users"""
         from datetime import datetime
@@ -260,5 +349,25 @@ class EmailService:
             to_name=name
         )
 
+    async def send_order_status_emails(self, notifications: List[dict]) -> int:
+        """
+        Send order status notifications as one batch
+        notifications: [{"email", "name", "order_id", "status", "tracking_number"}, ...]
+        """
+        from datetime import datetime
+        
+        year = datetime.now().year
+        messages = [
+            self._build_message(
+                to_email=notification['email'],
+                subject=f"Order Update - #{notification['order_id']} - Dbanyan Group",
+                template_name='order_status_update',
+                template_data={**notification, 'year': year},
+                to_name=notification.get('name')
+            )
+            for notification in notifications
+        ]
+        return await self.send_bulk_email(messages)
+
 # Global email service instance
 email_service = EmailService()
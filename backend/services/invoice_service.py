@@ -0,0 +1,322 @@
+# Dbanyan Group Backend - Invoice Generation
+# GST tax invoices rendered from the order snapshot in a process pool, so PDF work
+# never blocks the event loop. Output is cached on local disk, content-addressed by
+# order uid + a hash of updated_at: any change to the order yields a new file
+
+import asyncio
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from codec import from_document
+from config import settings
+from models import Order, OrderStatus, PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+# A4 in PDF points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 50
+ITEMS_PER_PAGE = 30
+
+# Orders that never became a sale get no invoice; unpaid online orders stay PENDING
+# (COD orders are CONFIRMED at creation)
+NON_INVOICEABLE_STATUSES = {OrderStatus.PENDING, OrderStatus.CANCELLED}
+NON_INVOICEABLE_PAYMENT_STATUSES = {PaymentStatus.FAILED, PaymentStatus.EXPIRED}
+
+
+# ---------- rendering (runs in worker processes; plain data in, file out) ----------
+
+def _pdf_text(value: Any) -> str:
+    """Escape a string for a PDF literal; base-14 fonts only cover Latin-1"""
+    text = str(value).encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _money(value: Any) -> str:
+    return f"INR {Decimal(str(value)):,.2f}"
+
+
+def _text_width(text: str, size: float) -> float:
+    """Approximate Helvetica width; exact for digits, close enough to right-align amounts"""
+    return len(text) * 0.556 * size
+
+
+class _PageWriter:
+    """Accumulates text operators for one page"""
+
+    def __init__(self):
+        self.ops: List[str] = []
+
+    def text(self, x: float, y: float, value: Any, size: float = 10, bold: bool = False) -> None:
+        font = "F2" if bold else "F1"
+        self.ops.append(f"BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({_pdf_text(value)}) Tj ET")
+
+    def right(self, x: float, y: float, value: str, size: float = 10, bold: bool = False) -> None:
+        self.text(x - _text_width(value, size), y, value, size, bold)
+
+    def rule(self, y: float) -> None:
+        self.ops.append(f"0.5 w {MARGIN} {y:.1f} m {PAGE_WIDTH - MARGIN} {y:.1f} l S")
+
+    def stream(self) -> bytes:
+        return "\n".join(self.ops).encode("latin-1")
+
+
+def _build_pdf(pages: List[bytes]) -> bytes:
+    """Assemble a minimal PDF 1.4 document from page content streams"""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in below once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for content in pages:
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        content_number = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_number)
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), len(page_refs))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref_offset
+    )
+    return bytes(output)
+
+
+def render_invoice_pdf(snapshot: Dict[str, Any], seller: Dict[str, str]) -> bytes:
+    """Render an invoice from a JSON-mode order dump"""
+    address = snapshot["shipping_address"]
+    invoice_number = snapshot.get("order_number") or snapshot["uid"]
+    invoice_date = (snapshot.get("confirmed_at") or snapshot["created_at"])[:10]
+    items = snapshot["items"]
+    chunks = [items[i:i + ITEMS_PER_PAGE] for i in range(0, len(items), ITEMS_PER_PAGE)] or [[]]
+    right_edge = PAGE_WIDTH - MARGIN
+
+    pages = []
+    row_number = 0
+    for page_index, chunk in enumerate(chunks):
+        page = _PageWriter()
+        y = PAGE_HEIGHT - MARGIN
+
+        page.text(MARGIN, y, "TAX INVOICE", 18, bold=True)
+        page.right(right_edge, y, f"Page {page_index + 1} of {len(chunks)}", 9)
+        y -= 24
+        page.text(MARGIN, y, seller["name"], 11, bold=True)
+        if seller["address"]:
+            y -= 14
+            page.text(MARGIN, y, seller["address"], 9)
+        if seller["gstin"]:
+            y -= 14
+            page.text(MARGIN, y, f"GSTIN: {seller['gstin']}", 9)
+
+        y -= 24
+        page.text(MARGIN, y, f"Invoice No: {invoice_number}", 10, bold=True)
+        page.right(right_edge, y, f"Invoice Date: {invoice_date}", 10)
+        y -= 14
+        page.text(MARGIN, y, f"Order ID: {snapshot['uid']}", 9)
+        page.right(right_edge, y, f"Payment: {snapshot['payment_status']}", 9)
+
+        if page_index == 0:
+            y -= 24
+            page.text(MARGIN, y, "Bill To", 10, bold=True)
+            bill_to = [
+                address["full_name"],
+                address["address_line_1"],
+                address.get("address_line_2"),
+                f"{address['city']}, {address['state']} {address['postal_code']}",
+                address.get("country"),
+                f"Phone: {address['phone']}",
+                snapshot["customer_email"],
+            ]
+            for line in filter(None, bill_to):
+                y -= 13
+                page.text(MARGIN, y, line, 9)
+
+        y -= 26
+        page.text(MARGIN, y, "#", 9, bold=True)
+        page.text(MARGIN + 25, y, "Item", 9, bold=True)
+        page.right(right_edge - 200, y, "Qty", 9, bold=True)
+        page.right(right_edge - 100, y, "Unit Price", 9, bold=True)
+        page.right(right_edge, y, "Amount", 9, bold=True)
+        y -= 6
+        page.rule(y)
+
+        for item in chunk:
+            row_number += 1
+            y -= 15
+            name = item["product_name"]
+            page.text(MARGIN, y, row_number, 9)
+            page.text(MARGIN + 25, y, name if len(name) <= 48 else name[:45] + "...", 9)
+            page.right(right_edge - 200, y, str(item["quantity"]), 9)
+            page.right(right_edge - 100, y, _money(item["unit_price"]), 9)
+            page.right(right_edge, y, _money(item["total_price"]), 9)
+
+        if page_index == len(chunks) - 1:
+            y -= 10
+            page.rule(y)
+            totals = [
+                ("Subtotal", snapshot["subtotal"]),
+                ("Discount" + (f" ({snapshot['coupon_code']})" if snapshot.get("coupon_code") else ""),
+                 f"-{snapshot['discount_amount']}" if Decimal(str(snapshot["discount_amount"])) else "0"),
+                ("Shipping", snapshot["shipping_cost"]),
+                ("GST (18%)", snapshot["tax_amount"]),
+            ]
+            for label, amount in totals:
+                y -= 15
+                page.right(right_edge - 120, y, label, 9)
+                page.right(right_edge, y, _money(amount), 9)
+            y -= 18
+            page.right(right_edge - 120, y, "Total", 11, bold=True)
+            page.right(right_edge, y, _money(snapshot["total_amount"]), 11, bold=True)
+
+        page.text(MARGIN, MARGIN, "This is a computer-generated invoice and does not require a signature.", 8)
+        pages.append(page.stream())
+
+    return _build_pdf(pages)
+
+
+def render_invoice_file(snapshot: Dict[str, Any], seller: Dict[str, str], path: str) -> str:
+    """Worker entry point: render and write atomically, so only the path crosses processes"""
+    pdf = render_invoice_pdf(snapshot, seller)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(pdf)
+    os.replace(temp_path, path)
+    return path
+
+
+# ---------- async front end ----------
+
+class InvoiceService:
+    """App-scoped invoice renderer with an on-disk cache"""
+
+    def __init__(self, cache_dir: str, workers: int):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.seller = {
+            "name": settings.INVOICE_SELLER_NAME,
+            "address": settings.INVOICE_SELLER_ADDRESS,
+            "gstin": settings.INVOICE_SELLER_GSTIN,
+        }
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def is_invoiceable(order: Order) -> bool:
+        return (order.status not in NON_INVOICEABLE_STATUSES
+                and order.payment_status not in NON_INVOICEABLE_PAYMENT_STATUSES)
+
+    def cache_path(self, order: Order) -> str:
+        """Content-addressed location: <cache_dir>/<uid>/<hash(updated_at)>.pdf"""
+        version = hashlib.sha256(order.updated_at.isoformat().encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, str(order.uid), f"{version}.pdf")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop worker processes (call from app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _prune_stale(self, current: str) -> None:
+        """Drop renders of earlier versions of the same order (only its own directory is listed)"""
+        order_dir = os.path.dirname(current)
+        for name in os.listdir(order_dir):
+            path = os.path.join(order_dir, name)
+            if name.endswith(".pdf") and path != current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    async def get_invoice(self, order: Order) -> Tuple[str, bool]:
+        """Path to the order's invoice PDF and whether it was served from cache"""
+        path = self.cache_path(order)
+        if os.path.exists(path):
+            return path, True
+
+        # Concurrent requests for the same version share one render
+        future = self._in_flight.get(path)
+        if future is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._get_executor(), render_invoice_file,
+                order.model_dump(mode="json"), self.seller, path
+            )
+            self._in_flight[path] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(path, None))
+        await asyncio.shield(future)
+        self._prune_stale(path)
+        return path, False
+
+    async def generate_month(
+        self,
+        db: AsyncIOMotorDatabase,
+        year: int,
+        month: int,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Month-end batch: render every invoiceable order created in the month
+        Orders are streamed from live and archived collections and rendered in
+        bounded windows, so memory stays flat however large the month is
+        """
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+        query = {
+            "created_at": {"$gte": start, "$lt": end},
+            "status": {"$nin": [s.value for s in NON_INVOICEABLE_STATUSES]},
+            "payment_status": {"$nin": [s.value for s in NON_INVOICEABLE_PAYMENT_STATUSES]},
+        }
+        window = concurrency or self.workers * 4
+        summary = {"generated": 0, "cached": 0, "failed": 0}
+
+        async def render(order: Order) -> None:
+            try:
+                _, cached = await self.get_invoice(order)
+                summary["cached" if cached else "generated"] += 1
+            except Exception as e:
+                summary["failed"] += 1
+                logger.error(f"Invoice render failed for order {order.uid}: {e}")
+
+        pending: List[Order] = []
+        for collection in (db.orders, db.orders_archive):
+            async for doc in collection.find(query).sort("created_at", 1):
+                pending.append(from_document(Order, doc))
+                if len(pending) >= window:
+                    await asyncio.gather(*(render(order) for order in pending))
+                    pending.clear()
+        if pending:
+            await asyncio.gather(*(render(order) for order in pending))
+
+        logger.info(f"Invoices for {year}-{month:02d}: {summary}")
+        return summary
+
+
+# Global invoice service instance
+invoice_service = InvoiceService(settings.INVOICE_CACHE_DIR, settings.INVOICE_RENDER_WORKERS)
@@ -1,15 +1,73 @@
 # Dbanyan Group Backend - Newsletter Service
 # Implementing project_context.md Section 2.7: Newsletter signup - FR7.2
 
+import codecs
+import csv
+import io
 import logging
-from typing import List
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
+from uuid import uuid4
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from models import NewsletterSubscriber, SubscriberCreate
+from codec import from_document
+from config import settings
+from db import EMAIL_COLLATION
 
 logger = logging.getLogger(__name__)
 
+# Pragmatic address check for bulk imports (email-validator per row is too slow at 200k rows)
+EMAIL_PATTERN = re.compile(
+    r"^[a-z0-9.!#$%&'*+/=?^_`{|}~-]+@"
+    r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?(?:\.[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?)+$"
+)
+MAX_EMAIL_LENGTH = 254
+INVALID_SAMPLE_SIZE = 20
+
+# Projections for keyset iteration
+LEAN_SUBSCRIBER_PROJECTION = {"uid": 1, "email": 1, "created_at": 1}
+FULL_SUBSCRIBER_PROJECTION = {"uid": 1, "email": 1, "is_active": 1, "created_at": 1}
+
+
+def normalize_email(email: str) -> str:
+    """Canonical stored form of a subscriber email"""
+    return email.strip().lower()
+
+
+def subscribe_pipeline(email: str, now: datetime) -> List[Dict[str, Any]]:
+    """
+    Upsert pipeline shared by single and bulk subscribe
+    Inactive rows (including ones with no is_active) are reactivated with a fresh
+    created_at; active rows are left byte-identical, so the server reports them as
+    matched but not modified. The email is user input, so it goes in as $literal:
+    an address starting with "$" would otherwise be evaluated as a field path
+    """
+    return [{"$set": {
+        "uid": {"$ifNull": ["$uid", uuid4()]},
+        "email": {"$ifNull": ["$email", {"$literal": email}]},
+        "created_at": {"$cond": [{"$eq": ["$is_active", True]}, "$created_at", now]},
+        "is_active": True
+    }}]
+
+
+async def csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[List[str]]]:
+    """Parse a streamed CSV upload into lists of rows, one list per received chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        if lines:
+            yield list(csv.reader(lines))
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield list(csv.reader([pending]))
+
 
 class NewsletterService:
     """Business logic for newsletter subscription management"""
@@ -19,39 +77,50 @@ class NewsletterService:
         self.collection = db.subscribers
     
     async def subscribe(self, subscriber_data: SubscriberCreate) -> dict:
-        """Subscribe user to newsletter"""
+        """
+        Subscribe user to newsletter in one round trip
+        A single conditional upsert: the pre-image tells the outcome apart
+        (none: new, inactive: reactivated, active: already subscribed) and the
+        unique case-insensitive index makes concurrent signups race-free
+        """
         try:
-            # Check if email already exists
-            existing = await self.collection.find_one({"email": subscriber_data.email})
-            
-            if existing:
-                if existing.get("is_active", True):
-                    return {
-                        "success": False,
-                        "message": "Email already subscribed"
-                    }
-                else:
-                    # Reactivate existing subscription
-                    await self.collection.update_one(
-                        {"email": subscriber_data.email},
-                        {"$set": {"is_active": True, "created_at": datetime.utcnow()}}
-                    )
-                    return {
-                        "success": True,
-                        "message": "Subscription reactivated successfully"
-                    }
-            
-            # Create new subscription
-            subscriber = NewsletterSubscriber(email=subscriber_data.email)
-            await self.collection.insert_one(subscriber.model_dump(mode='json'))
-            
-            logger.info(f"Newsletter subscription: {subscriber_data.email}")
+            email = normalize_email(subscriber_data.email)
+            now = datetime.utcnow()
+            previous = await self.collection.find_one_and_update(
+                {"email": email},
+                subscribe_pipeline(email, now),
+                projection={"_id": 0, "is_active": 1},
+                upsert=True,
+                collation=EMAIL_COLLATION,
+                return_document=ReturnDocument.BEFORE
+            )
             
+            if previous is None:
+                logger.info(f"Newsletter subscription: {email}")
+                return {
+                    "success": True,
+                    "status": "new",
+                    "message": "Subscribed successfully"
+                }
+            if previous.get("is_active") is not True:  # missing counts as inactive, as in the pipeline
+                return {
+                    "success": True,
+                    "status": "reactivated",
+                    "message": "Subscription reactivated successfully"
+                }
             return {
-                "success": True,
-                "message": "Subscribed successfully"
+                "success": False,
+                "status": "already_active",
+                "message": "Email already subscribed"
             }
             
+        except DuplicateKeyError:
+            # Two first-time signups for the same address raced; the other one won
+            return {
+                "success": False,
+                "status": "already_active",
+                "message": "Email already subscribed"
+            }
         except Exception as e:
             logger.error(f"Error subscribing to newsletter: {e}")
             return {
@@ -59,12 +128,76 @@ class NewsletterService:
                 "message": "Failed to subscribe"
             }
     
+    async def import_subscribers(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Bulk import from a streamed CSV (an "email" column, or the first column)
+        Rows are normalized, validated and deduped in memory, then written in
+        batches of unordered bulk upserts; memory is bounded by the batch size
+        plus the set of addresses seen
+        """
+        batch_size = settings.SUBSCRIBER_IMPORT_BATCH_SIZE
+        summary = {"rows": 0, "added": 0, "reactivated": 0, "already_active": 0,
+                   "duplicates": 0, "invalid": 0, "failed": 0, "invalid_samples": []}
+        seen = set()
+        batch: List[UpdateOne] = []
+        email_column = None
+        
+        async def flush() -> None:
+            try:
+                result = await self.collection.bulk_write(batch, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                summary["failed"] += len(details.get("writeErrors", []))
+            summary["added"] += details.get("nUpserted", 0)
+            summary["reactivated"] += details.get("nModified", 0)
+            summary["already_active"] += details.get("nMatched", 0) - details.get("nModified", 0)
+            batch.clear()
+        
+        async for rows in csv_rows(chunks):
+            for row in rows:
+                if not row:
+                    continue
+                if email_column is None:
+                    header = [cell.strip().lower() for cell in row]
+                    if "email" in header:
+                        email_column = header.index("email")
+                        continue
+                    email_column = 0
+                
+                summary["rows"] += 1
+                email = normalize_email(row[email_column]) if email_column < len(row) else ""
+                if len(email) > MAX_EMAIL_LENGTH or not EMAIL_PATTERN.match(email):
+                    summary["invalid"] += 1
+                    if len(summary["invalid_samples"]) < INVALID_SAMPLE_SIZE:
+                        summary["invalid_samples"].append(email)
+                    continue
+                if email in seen:
+                    summary["duplicates"] += 1
+                    continue
+                seen.add(email)
+                
+                batch.append(UpdateOne(
+                    {"email": email}, subscribe_pipeline(email, datetime.utcnow()),
+                    upsert=True, collation=EMAIL_COLLATION
+                ))
+                if len(batch) >= batch_size:
+                    await flush()
+        
+        if batch:
+            await flush()
+        
+        logger.info(f"Subscriber import: {summary['added']} added, {summary['reactivated']} reactivated, "
+                    f"{summary['invalid']} invalid of {summary['rows']} rows")
+        return summary
+    
     async def unsubscribe(self, email: str) -> dict:
         """Unsubscribe user from newsletter"""
         try:
             result = await self.collection.update_one(
-                {"email": email},
-                {"$set": {"is_active": False}}
+                {"email": normalize_email(email)},
+                {"$set": {"is_active": False}},
+                collation=EMAIL_COLLATION
             )
             
             if result.modified_count > 0:
@@ -85,19 +218,59 @@ class NewsletterService:
                 "message": "Failed to unsubscribe"
             }
     
+    async def iter_subscribers(
+        self,
+        active_only: bool = True,
+        batch_size: Optional[int] = None,
+        projection: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Page through subscribers by _id keyset, yielding lean raw documents per page
+        Each page is a fresh indexed range query, so consumers run in constant memory
+        and no cursor is held open across slow work (e.g. sending mail)
+        """
+        batch_size = batch_size or settings.SUBSCRIBER_PAGE_SIZE
+        projection = projection or LEAN_SUBSCRIBER_PROJECTION
+        query_filter: Dict[str, Any] = {"is_active": True} if active_only else {}
+        last_id = None
+        
+        while True:
+            page_filter = {**query_filter, "_id": {"$gt": last_id}} if last_id else query_filter
+            page = await self.collection.find(
+                page_filter, {**projection, "_id": 1}
+            ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not page:
+                return
+            last_id = page[-1]["_id"]
+            yield page
+            if len(page) < batch_size:
+                return
+    
+    async def export_subscribers(self, active_only: bool = True) -> AsyncIterator[str]:
+        """CSV export, one chunk per page"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["uid", "email", "is_active", "subscribed_at"])
+        async for page in self.iter_subscribers(active_only, projection=FULL_SUBSCRIBER_PROJECTION):
+            for doc in page:
+                # Legacy rows may lack uid/is_active/created_at; missing is_active means inactive
+                writer.writerow([
+                    doc.get("uid", ""), doc.get("email", ""), doc.get("is_active", False),
+                    doc["created_at"].isoformat() if doc.get("created_at") else ""
+                ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    
     async def get_all_subscribers(self, active_only: bool = True) -> List[NewsletterSubscriber]:
-        """Get all newsletter subscribers"""
+        """Get all newsletter subscribers (materializes the list; prefer iter_subscribers)"""
         try:
-            query_filter = {"is_active": True} if active_only else {}
-            
-            cursor = self.collection.find(query_filter).sort("created_at", -1)
-            subscribers_docs = await cursor.to_list(length=None)
-            
             subscribers = []
-            for doc in subscribers_docs:
-                doc['uid'] = doc['uid'] if isinstance(doc['uid'], str) else str(doc['uid'])
-                subscribers.append(NewsletterSubscriber(**doc))
-            
+            async for page in self.iter_subscribers(active_only, projection=FULL_SUBSCRIBER_PROJECTION):
+                subscribers.extend(from_document(NewsletterSubscriber, doc) for doc in page)
+            subscribers.sort(key=lambda subscriber: subscriber.created_at, reverse=True)
             return subscribers
             
         except Exception as e:
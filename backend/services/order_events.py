@@ -0,0 +1,161 @@
+# Dbanyan Group Backend - Live Order Events
+# One shared MongoDB change stream on orders, fanned out to SSE subscribers
+# Replaces per-client polling of GET /orders/{uid} with a single server-side stream
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+from uuid import UUID
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fields customers care about; other updates never reach the watcher
+WATCHED_FIELDS = ["status", "payment_status", "tracking_number"]
+
+# Projection for the initial snapshot sent on connect
+SNAPSHOT_PROJECTION = {"_id": 1, "uid": 1, "status": 1, "payment_status": 1,
+                       "tracking_number": 1, "updated_at": 1}
+
+# Server error code when the resume token has fallen off the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Event frame"""
+    payload = json.dumps({
+        key: value.isoformat() if isinstance(value, datetime)
+        else str(value) if isinstance(value, UUID) else value
+        for key, value in data.items()
+    })
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class OrderEventBroker:
+    """App-scoped change-stream watcher; subscribers are keyed by the order's _id"""
+
+    def __init__(self, queue_size: int = 16):
+        self.queue_size = queue_size
+        self._subscribers: Dict[ObjectId, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self._collection = None
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the watcher task (call once from app startup)"""
+        if self._task is None:
+            self._collection = db.orders
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Cancel the watcher task on shutdown"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self, order_id: ObjectId) -> asyncio.Queue:
+        """Register a connection for updates to one order"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(order_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, order_id: ObjectId, queue: asyncio.Queue) -> None:
+        """Drop a connection; forget the order once nobody listens"""
+        queues = self._subscribers.get(order_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[order_id]
+
+    async def event_stream(
+        self,
+        order_id: ObjectId,
+        is_disconnected: Callable[[], Awaitable[bool]]
+    ) -> AsyncIterator[str]:
+        """
+        SSE frames for one connection: a snapshot, then live updates, with heartbeats
+        The subscription is registered before the snapshot is read, so a change landing
+        in between is queued (at worst sent twice) rather than lost
+        Reconnecting clients get a fresh snapshot, so no per-client replay is needed
+        """
+        queue = self.subscribe(order_id)
+        try:
+            snapshot = await self._collection.find_one({"_id": order_id}, SNAPSHOT_PROJECTION)
+            if not snapshot:
+                return
+            snapshot.pop("_id")
+            yield f"retry: {settings.ORDER_EVENTS_RETRY_MS}\n"
+            yield format_sse("snapshot", snapshot)
+            while not await is_disconnected():
+                try:
+                    data = await asyncio.wait_for(
+                        queue.get(), timeout=settings.ORDER_EVENTS_HEARTBEAT_SECONDS
+                    )
+                    yield format_sse("update", data)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            self.unsubscribe(order_id, queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def _dispatch(self, change: Dict[str, Any]) -> None:
+        """Fan one change event out to the order's subscribers"""
+        queues = self._subscribers.get(change["documentKey"]["_id"])
+        if not queues:
+            return
+
+        updated = change.get("updateDescription", {}).get("updatedFields", {})
+        data = {field: updated[field] for field in WATCHED_FIELDS + ["updated_at"] if field in updated}
+        for queue in queues:
+            if queue.full():
+                # Slow client: events are state snapshots, so drop the oldest
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    async def _watch(self) -> None:
+        """Tail the orders change stream forever, resuming after errors"""
+        match_any_field = [
+            {f"updateDescription.updatedFields.{field}": {"$exists": True}} for field in WATCHED_FIELDS
+        ]
+        pipeline = [{"$match": {"operationType": "update", "$or": match_any_field}}]
+        backoff = 1
+
+        while True:
+            try:
+                async with self._collection.watch(pipeline, resume_after=self._resume_token) as stream:
+                    logger.info("Order change stream watcher started")
+                    backoff = 1
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self._dispatch(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    logger.warning("Order change stream history lost; restarting from now")
+                    self._resume_token = None
+                else:
+                    logger.error(f"Order change stream error: {e}")
+            except Exception as e:
+                logger.error(f"Order change stream error: {e}")
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+# Global order event broker instance
+order_event_broker = OrderEventBroker()
@@ -0,0 +1,87 @@
+# Dbanyan Group Backend - Order Number Generator
+# Short, human-readable order numbers (e.g. DB-0001AK7) for support and customers
+# Each worker leases a block of sequence numbers from the counters collection with a
+# single $inc and hands them out from memory, so checkout needs no extra round trip
+
+import asyncio
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from config import settings
+
+# Crockford base32: no I, L, O, U - nothing to mishear over the phone
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+BASE = len(ALPHABET)
+PREFIX = "DB-"
+MIN_WIDTH = 6
+COUNTER_ID = "order_number"
+
+
+def check_symbol(body: str) -> str:
+    """Luhn mod 32 check symbol - catches single-character and most transposition errors"""
+    total = 0
+    factor = 2
+    for char in reversed(body):
+        addend = factor * ALPHABET.index(char)
+        total += addend // BASE + addend % BASE
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(BASE - total % BASE) % BASE]
+
+
+def format_order_number(sequence: int) -> str:
+    """Encode a sequence number as PREFIX + base32 body + check symbol"""
+    body = ""
+    while sequence:
+        sequence, remainder = divmod(sequence, BASE)
+        body = ALPHABET[remainder] + body
+    body = body.rjust(MIN_WIDTH, "0")
+    return f"{PREFIX}{body}{check_symbol(body)}"
+
+
+def normalize_order_number(value: str) -> Optional[str]:
+    """Canonical form of a typed/read-out order number, or None if the check symbol fails"""
+    cleaned = value.strip().upper().replace(" ", "").replace("-", "")
+    if cleaned.startswith(PREFIX.rstrip("-")):
+        cleaned = cleaned[len(PREFIX) - 1:]
+    cleaned = cleaned.replace("O", "0").replace("I", "1").replace("L", "1")
+    if len(cleaned) < MIN_WIDTH + 1 or any(char not in ALPHABET for char in cleaned):
+        return None
+    body, check = cleaned[:-1], cleaned[-1]
+    if check_symbol(body) != check:
+        return None
+    return f"{PREFIX}{body}{check}"
+
+
+class OrderNumberAllocator:
+    """Per-process allocator handing out numbers from leased blocks"""
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _lease_block(self, db: AsyncIOMotorDatabase) -> None:
+        counter = await db.counters.find_one_and_update(
+            {"_id": COUNTER_ID},
+            {"$inc": {"value": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._end = counter["value"] + 1
+        self._next = self._end - self.block_size
+
+    async def next_order_number(self, db: AsyncIOMotorDatabase) -> str:
+        """Next order number; only every block_size-th call touches the database"""
+        async with self._lock:
+            if self._next >= self._end:
+                await self._lease_block(db)
+            sequence = self._next
+            self._next += 1
+        return format_order_number(sequence)
+
+
+# Global order number allocator instance (unused numbers of a block are lost on restart)
+order_number_allocator = OrderNumberAllocator(settings.ORDER_NUMBER_BLOCK_SIZE)
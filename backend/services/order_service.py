@@ -2,23 +2,205 @@
 # Implementing project_context.md Section 2.4: Cart & Checkout Flow
 # FR4.1-FR4.5: Complete order management with Razorpay integration
 
+import asyncio
+import base64
+import csv
+import io
+import json
 import logging
-from typing import List, Optional, Dict, Any
-from uuid import UUID
-from datetime import datetime
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable
+from uuid import UUID, uuid4
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 import razorpay
+from bson.decimal128 import Decimal128
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
 from models import (
     Order, OrderCreate, OrderStatus, PaymentStatus, OrderItem,
-    ResponseModel
+    OrderAdminRow, OrderPage, OrderSummary, OrderSummaryPage, OrderStatusUpdate,
+    OrderStatusUpdateResult, CartQuote, ResponseModel
 )
 from services.product_service import ProductService
+from services.order_stats_service import OrderStatsService
+from services.order_number_service import order_number_allocator
+from services.promotion_engine import promotion_engine
+from codec import to_document, from_document
 from config import settings
+from db import PENDING_ONLINE_ORDERS_INDEX
 
 logger = logging.getLogger(__name__)
 
+# Fields the expiry sweeper needs to release an order's holds
+EXPIRY_PROJECTION = {"_id": 1, "uid": 1, "status": 1, "created_at": 1, "customer_email": 1,
+                     "coupon_code": 1, "coupon_uid": 1, "coupon_shard": 1}
+
+# Orders in these states never change again and can be archived once aged out
+ARCHIVABLE_STATUSES = {OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.REFUNDED}
+
+# Status changes customers are emailed about
+NOTIFY_STATUSES = {OrderStatus.SHIPPED, OrderStatus.DELIVERED, OrderStatus.CANCELLED}
+
+# Bulk status writes stamp their call id so rows that lost a race can be told apart;
+# the last few are kept so a write landing right after ours does not hide it
+STATUS_WRITE_IDS_KEPT = 4
+
+# Newest first; uid breaks ties between orders created in the same instant
+KEYSET_SORT = [("created_at", -1), ("uid", -1)]
+
+# Only the fields an admin table row needs - no line items or addresses on the wire
+ADMIN_ROW_PROJECTION = {
+    "_id": 0,
+    "uid": 1,
+    "order_number": 1,
+    "customer_email": 1,
+    "customer_name": "$shipping_address.full_name",
+    "status": 1,
+    "payment_status": 1,
+    "total_amount": 1,
+    "tracking_number": 1,
+    "created_at": 1,
+    "item_count": {"$size": "$items"}
+}
+
+
+# Customer history rows; full detail is fetched per order via get_order_by_uid
+SUMMARY_PROJECTION = {
+    "_id": 0,
+    "uid": 1,
+    "order_number": 1,
+    "status": 1,
+    "payment_status": 1,
+    "total_amount": 1,
+    "created_at": 1,
+    "item_count": {"$size": "$items"}
+}
+
+
+# Export columns; money as plain decimal strings, timestamps as ISO 8601
+EXPORT_ORDER_COLUMNS = [
+    "uid", "order_number", "created_at", "customer_email", "customer_name", "status", "payment_status",
+    "subtotal", "discount_amount", "shipping_cost", "tax_amount", "total_amount",
+    "coupon_code", "razorpay_order_id", "razorpay_payment_id", "tracking_number",
+    "city", "state", "postal_code", "item_count"
+]
+EXPORT_ITEM_COLUMNS = ["product_uid", "product_name", "quantity", "unit_price", "line_total"]
+
+
+def _admin_filter(
+    status_filter: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Shared filter for admin listing and export"""
+    filter_query: Dict[str, Any] = {}
+    if status_filter:
+        filter_query["status"] = status_filter
+    if payment_status:
+        filter_query["payment_status"] = payment_status
+    
+    created_range = {}
+    if created_from:
+        created_range["$gte"] = created_from
+    if created_to:
+        created_range["$lt"] = created_to
+    if created_range:
+        filter_query["created_at"] = created_range
+    return filter_query
+
+
+def _export_scalar(value: Any) -> Any:
+    """Plain JSON/CSV value for a raw BSON field"""
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _export_value(value: Any) -> Any:
+    """Recursive _export_scalar for whole NDJSON documents"""
+    if isinstance(value, dict):
+        return {key: _export_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_export_value(item) for item in value]
+    return _export_scalar(value)
+
+
+def _export_order_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a raw order document into export columns (no model validation)"""
+    address = doc.get("shipping_address") or {}
+    row = {column: _export_scalar(doc.get(column)) for column in EXPORT_ORDER_COLUMNS}
+    row["customer_name"] = address.get("full_name")
+    row["city"] = address.get("city")
+    row["state"] = address.get("state")
+    row["postal_code"] = address.get("postal_code")
+    row["item_count"] = len(doc.get("items") or [])
+    return row
+
+
+def _export_item_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "product_uid": _export_scalar(item.get("product_uid")),
+        "product_name": item.get("product_name"),
+        "quantity": item.get("quantity"),
+        "unit_price": _export_scalar(item.get("unit_price")),
+        "line_total": _export_scalar(item.get("total_price"))
+    }
+
+
+async def _merge_sorted(
+    first: AsyncIterator[Dict[str, Any]],
+    second: AsyncIterator[Dict[str, Any]],
+    key: Callable[[Dict[str, Any]], Any]
+) -> AsyncIterator[Dict[str, Any]]:
+    """Merge two cursors already sorted by key, keeping both streaming"""
+    async def next_or_none(cursor):
+        try:
+            return await cursor.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    a, b = await next_or_none(first), await next_or_none(second)
+    while a is not None or b is not None:
+        if b is None or (a is not None and key(a) <= key(b)):
+            yield a
+            a = await next_or_none(first)
+        else:
+            yield b
+            b = await next_or_none(second)
+
+
+def _encode_cursor(created_at: datetime, uid: Any) -> str:
+    """Opaque page cursor from the last row's sort key"""
+    raw = f"{created_at.isoformat()}|{uid}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Inverse of _encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        created_at, uid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(uid)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _keyset_after(cursor: str) -> Dict[str, Any]:
+    """Filter clause selecting rows strictly after the cursor in KEYSET_SORT order"""
+    last_created_at, last_uid = _decode_cursor(cursor)
+    return {
+        "$or": [
+            {"created_at": {"$lt": last_created_at}},
+            {"created_at": last_created_at, "uid": {"$lt": last_uid}}
+        ]
+    }
+
 
 class OrderService:
     """Business logic for order management"""
@@ -26,7 +208,9 @@ class OrderService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.collection = db.orders
+        self.archive_collection = db.orders_archive
         self.product_service = ProductService(db)
+        self.stats_service = OrderStatsService(db)
         
         # Initialize Razorpay client
         self.razorpay_client = razorpay.Client(
@@ -38,10 +222,13 @@ class OrderService:
         Create order with Razorpay integration - FR4.4
         Returns order details and Razorpay order for frontend
         """
+        order_uid = uuid4()
+        coupon_hold: Dict[str, Any] = {}
+        order_saved = False
         try:
             # 1. Validate stock availability - FR3.3
             items_for_stock_check = [
-                {"product_uid": str(item.product_uid), "quantity": item.quantity}
+                {"product_uid": item.product_uid, "quantity": item.quantity}
                 for item in order_data.items
             ]
             
@@ -57,14 +244,16 @@ class OrderService:
             subtotal = sum(item.total_price for item in order_data.items)
             discount_amount = Decimal('0.00')
             
-            # Apply coupon if provided - FR4.3
-            if order_data.coupon_code:
-                coupon_service = CouponService(self.db)
-                discount_result = await coupon_service.apply_coupon(
-                    order_data.coupon_code, subtotal
+            # Apply promotions, then the coupon if provided - FR4.3 (takes one use of it atomically)
+            promotions = await self._apply_promotions(order_data.items, order_data.coupon_code)
+            if not promotions["code_applied"]:
+                coupon_hold = await self._redeem_coupon(
+                    order_data.coupon_code, subtotal - promotions["discount_amount"],
+                    order_data.customer_email, order_uid
                 )
-                if discount_result["valid"]:
-                    discount_amount = discount_result["discount_amount"]
+                if coupon_hold.get("error"):
+                    return {"success": False, "message": coupon_hold["error"]}
+            discount_amount = promotions["discount_amount"] + coupon_hold.get("discount_amount", discount_amount)
             
             # Calculate final amounts
             shipping_cost = self._calculate_shipping_cost(subtotal)
@@ -73,6 +262,8 @@ class OrderService:
             
             # 3. Create order object
             order = Order(
+                uid=order_uid,
+                order_number=await order_number_allocator.next_order_number(self.db),
                 customer_email=order_data.customer_email,
                 items=order_data.items,
                 shipping_address=order_data.shipping_address,
@@ -82,6 +273,9 @@ class OrderService:
                 tax_amount=tax_amount,
                 total_amount=total_amount,
                 coupon_code=order_data.coupon_code,
+                applied_promotions=promotions["applied"],
+                coupon_uid=coupon_hold.get("coupon_uid"),
+                coupon_shard=coupon_hold.get("coupon_shard"),
                 notes=order_data.notes
             )
             
@@ -89,7 +283,7 @@ class OrderService:
             razorpay_order_data = {
                 "amount": int(total_amount * 100),  # Razorpay expects paise
                 "currency": "INR",
-                "receipt": str(order.uid),
+                "receipt": order.order_number,
                 "notes": {
                     "customer_email": order_data.customer_email,
                     "order_uid": str(order.uid)
@@ -100,7 +294,9 @@ class OrderService:
             order.razorpay_order_id = razorpay_order["id"]
             
             # 5. Save order to database
-            await self.collection.insert_one(order.model_dump(mode='json'))
+            await self.collection.insert_one(to_document(order))
+            order_saved = True
+            await self.stats_service.record_order_created(order.created_at, order.status.value)
             
             logger.info(f"Order created: {order.uid}")
             
@@ -114,6 +310,8 @@ class OrderService:
             
         except Exception as e:
             logger.error(f"Error creating order: {e}")
+            if not order_saved:
+                await self._release_coupon(coupon_hold)
             return {
                 "success": False,
                 "message": f"Failed to create order: {str(e)}"
@@ -124,10 +322,13 @@ class OrderService:
         Create Cash on Delivery order - FR4.4
         Bypasses Razorpay integration
         """
+        order_uid = uuid4()
+        coupon_hold: Dict[str, Any] = {}
+        order_saved = False
         try:
             # 1. Validate stock availability - FR3.3
             items_for_stock_check = [
-                {"product_uid": str(item.product_uid), "quantity": item.quantity}
+                {"product_uid": item.product_uid, "quantity": item.quantity}
                 for item in order_data.items
             ]
             
@@ -143,14 +344,16 @@ class OrderService:
             subtotal = sum(item.total_price for item in order_data.items)
             discount_amount = Decimal('0.00')
             
-            # Apply coupon if provided - FR4.3
-            if order_data.coupon_code:
-                coupon_service = CouponService(self.db)
-                discount_result = await coupon_service.apply_coupon(
-                    order_data.coupon_code, subtotal
+            # Apply promotions, then the coupon if provided - FR4.3 (takes one use of it atomically)
+            promotions = await self._apply_promotions(order_data.items, order_data.coupon_code)
+            if not promotions["code_applied"]:
+                coupon_hold = await self._redeem_coupon(
+                    order_data.coupon_code, subtotal - promotions["discount_amount"],
+                    order_data.customer_email, order_uid
                 )
-                if discount_result["valid"]:
-                    discount_amount = discount_result["discount_amount"]
+                if coupon_hold.get("error"):
+                    return {"success": False, "message": coupon_hold["error"]}
+            discount_amount = promotions["discount_amount"] + coupon_hold.get("discount_amount", discount_amount)
             
             # Calculate final amounts
             shipping_cost = self._calculate_shipping_cost(subtotal)
@@ -159,6 +362,8 @@ class OrderService:
             
             # 3. Create order object (COD specific)
             order = Order(
+                uid=order_uid,
+                order_number=await order_number_allocator.next_order_number(self.db),
                 customer_email=order_data.customer_email,
                 items=order_data.items,
                 shipping_address=order_data.shipping_address,
@@ -168,17 +373,22 @@ class OrderService:
                 tax_amount=tax_amount,
                 total_amount=total_amount,
                 coupon_code=order_data.coupon_code,
+                applied_promotions=promotions["applied"],
+                coupon_uid=coupon_hold.get("coupon_uid"),
+                coupon_shard=coupon_hold.get("coupon_shard"),
                 notes=order_data.notes,
                 payment_status=PaymentStatus.PENDING,  # COD is pending until delivery
                 status=OrderStatus.CONFIRMED  # COD orders are auto-confirmed
             )
             
             # 4. Save order to database
-            await self.collection.insert_one(order.model_dump(mode='json'))
+            await self.collection.insert_one(to_document(order))
+            order_saved = True
+            await self.stats_service.record_order_created(order.created_at, order.status.value)
             
             # 5. Decrement product quantities immediately for COD
             items_for_decrement = [
-                {"product_uid": str(item.product_uid), "quantity": item.quantity}
+                {"product_uid": item.product_uid, "quantity": item.quantity}
                 for item in order.items
             ]
             
@@ -192,11 +402,14 @@ class OrderService:
                 "success": True,
                 "message": "COD order created successfully",
                 "order_uid": str(order.uid),
+                "order_number": order.order_number,
                 "order": order
             }
             
         except Exception as e:
             logger.error(f"Error creating COD order: {e}")
+            if not order_saved:
+                await self._release_coupon(coupon_hold)
             return {
                 "success": False,
                 "message": f"Failed to create COD order: {str(e)}"
@@ -219,37 +432,68 @@ class OrderService:
                     "message": "Payment verification failed"
                 }
             
-            # 2. Find order by Razorpay order ID
-            order_doc = await self.collection.find_one({
-                "razorpay_order_id": payment_data["razorpay_order_id"]
-            })
-            
-            if not order_doc:
-                return {
-                    "success": False,
-                    "message": "Order not found"
-                }
-            
-            # 3. Update order status
+            # 2. Atomically flip the order to paid - only the first confirmation of a
+            # still-pending order matches (expired/cancelled orders already gave back their holds)
+            now = datetime.utcnow()
             update_data = {
                 "razorpay_payment_id": payment_data["razorpay_payment_id"],
                 "payment_status": PaymentStatus.COMPLETED.value,
                 "status": OrderStatus.CONFIRMED.value,
-                "confirmed_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
+                "confirmed_at": now,
+                "updated_at": now
             }
             
-            await self.collection.update_one(
-                {"razorpay_order_id": payment_data["razorpay_order_id"]},
-                {"$set": update_data}
+            # Pre-image is returned so the rollups see the status being left;
+            # merging the $set gives the post-image without another round trip
+            previous_doc = await self.collection.find_one_and_update(
+                {
+                    "razorpay_order_id": payment_data["razorpay_order_id"],
+                    "payment_status": PaymentStatus.PENDING.value
+                },
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE
+            )
+            
+            if not previous_doc:
+                # Replayed confirmation (client retry / webhook redelivery): no side effects
+                existing = await self.collection.find_one(
+                    {"razorpay_order_id": payment_data["razorpay_order_id"]},
+                    {"uid": 1, "razorpay_payment_id": 1, "payment_status": 1}
+                )
+                if not existing:
+                    return {
+                        "success": False,
+                        "message": "Order not found"
+                    }
+                
+                if existing["payment_status"] != PaymentStatus.COMPLETED.value:
+                    return await self._flag_late_payment(existing, payment_data["razorpay_payment_id"])
+                
+                if existing.get("razorpay_payment_id") != payment_data["razorpay_payment_id"]:
+                    logger.warning(
+                        f"Order {existing['uid']} already paid with a different payment id"
+                    )
+                    return {
+                        "success": False,
+                        "message": "Order already paid with a different payment"
+                    }
+                
+                return {
+                    "success": True,
+                    "message": "Payment already confirmed",
+                    "order_uid": str(existing["uid"])
+                }
+            
+            order = from_document(Order, {**previous_doc, **update_data})
+            await self.stats_service.record_status_change(
+                order.created_at, previous_doc["status"], order.status.value
             )
+            await self.stats_service.record_payment(order.created_at, order.total_amount)
             
-            # 4. Decrement product quantities - FR3.2
-            order_doc['uid'] = UUID(order_doc['uid'])
-            order = Order(**order_doc)
+            # 3. Decrement product quantities - FR3.2
             
             items_for_decrement = [
-                {"product_uid": str(item.product_uid), "quantity": item.quantity}
+                {"product_uid": item.product_uid, "quantity": item.quantity}
                 for item in order.items
             ]
             
@@ -276,63 +520,346 @@ class OrderService:
     async def get_order_by_uid(self, uid: UUID) -> Optional[Order]:
         """Get order by UID"""
         try:
-            order_doc = await self.collection.find_one({"uid": str(uid)})
+            order_doc = await self.collection.find_one({"uid": uid})
+            if not order_doc:
+                # Aged-out terminal orders live in the archive
+                order_doc = await self.archive_collection.find_one({"uid": uid})
             if order_doc:
-                order_doc['uid'] = UUID(order_doc['uid'])
-                return Order(**order_doc)
+                return from_document(Order, order_doc)
             return None
             
         except Exception as e:
             logger.error(f"Error fetching order {uid}: {e}")
             raise
     
-    async def get_orders_by_email(self, email: str) -> List[Order]:
-        """Get all orders for a customer email"""
+    async def get_order_by_number(self, order_number: str) -> Optional[Order]:
+        """Get order by its human-readable number (live, then archive)"""
         try:
-            cursor = self.collection.find(
-                {"customer_email": email}
-            ).sort("created_at", -1)
+            order_doc = await self.collection.find_one({"order_number": order_number})
+            if not order_doc:
+                order_doc = await self.archive_collection.find_one({"order_number": order_number})
+            if order_doc:
+                return from_document(Order, order_doc)
+            return None
             
-            orders_docs = await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error fetching order {order_number}: {e}")
+            raise
+    
+    async def get_orders_by_email(
+        self,
+        email: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> OrderSummaryPage:
+        """
+        Get a page of order summaries for a customer email, newest first
+        Live and archived orders are merged so history stays complete
+        """
+        filter_query: Dict[str, Any] = {"customer_email": email}
+        if cursor:
+            filter_query.update(_keyset_after(cursor))
+        
+        try:
+            live_docs, _ = await self._fetch_page(filter_query, SUMMARY_PROJECTION, limit)
+            archived_docs, _ = await self._fetch_page(
+                filter_query, SUMMARY_PROJECTION, limit, collection=self.archive_collection
+            )
+            docs = sorted(
+                live_docs + archived_docs,
+                key=lambda doc: (doc["created_at"], doc["uid"]),
+                reverse=True
+            )
             
-            orders = []
-            for doc in orders_docs:
-                doc['uid'] = UUID(doc['uid'])
-                orders.append(Order(**doc))
+            next_cursor = None
+            if len(docs) > limit:
+                docs = docs[:limit]
+                next_cursor = _encode_cursor(docs[-1]["created_at"], docs[-1]["uid"])
             
-            return orders
+            return OrderSummaryPage(
+                items=[from_document(OrderSummary, doc) for doc in docs],
+                next_cursor=next_cursor
+            )
             
         except Exception as e:
             logger.error(f"Error fetching orders for {email}: {e}")
             raise
     
+    async def _fetch_page(
+        self,
+        filter_query: Dict[str, Any],
+        projection: Dict[str, Any],
+        limit: int,
+        collection: Optional[AsyncIOMotorCollection] = None
+    ) -> tuple:
+        """Run a keyset page query; returns (docs, next_cursor)"""
+        collection = collection if collection is not None else self.collection
+        # Fetch one extra row to learn whether another page exists
+        docs = await collection.find(
+            filter_query, projection
+        ).sort(KEYSET_SORT).limit(limit + 1).to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = _encode_cursor(docs[-1]["created_at"], docs[-1]["uid"])
+        
+        return docs, next_cursor
+    
+    async def _apply_promotions(self, items: List[OrderItem], code: Optional[str]) -> Dict[str, Any]:
+        """Evaluate the compiled active promotions against the cart (no DB access once loaded)"""
+        await promotion_engine.ensure_loaded(self.db)
+        return promotion_engine.evaluate(items, code)
+    
+    async def quote_cart(self, items: List[OrderItem], coupon_code: Optional[str] = None) -> CartQuote:
+        """Price a cart exactly as checkout would, without redeeming anything"""
+        subtotal = sum((item.total_price for item in items), Decimal('0.00'))
+        promotions = await self._apply_promotions(items, coupon_code)
+        promotion_discount = promotions["discount_amount"]
+        
+        coupon_discount = Decimal('0.00')
+        coupon_message = None
+        if coupon_code and not promotions["code_applied"]:
+            coupon_result = await CouponService(self.db).apply_coupon(
+                coupon_code, subtotal - promotion_discount
+            )
+            coupon_message = coupon_result["message"]
+            if coupon_result["valid"]:
+                coupon_discount = coupon_result["discount_amount"]
+        
+        discount_amount = promotion_discount + coupon_discount
+        shipping_cost = self._calculate_shipping_cost(subtotal)
+        tax_amount = self._calculate_tax(subtotal - discount_amount)
+        return CartQuote(
+            subtotal=subtotal,
+            promotion_discount=promotion_discount,
+            coupon_discount=coupon_discount,
+            discount_amount=discount_amount,
+            shipping_cost=shipping_cost,
+            tax_amount=tax_amount,
+            total_amount=subtotal - discount_amount + shipping_cost + tax_amount,
+            applied_promotions=promotions["applied"],
+            coupon_message=coupon_message
+        )
+    
+    async def _redeem_coupon(
+        self,
+        code: Optional[str],
+        subtotal: Decimal,
+        customer_email: str,
+        order_uid: UUID
+    ) -> Dict[str, Any]:
+        """
+        Price and redeem a coupon for a new order
+        Invalid codes are ignored as before; failing a usage rule at redemption is an error
+        """
+        if not code:
+            return {}
+        coupon_service = CouponService(self.db)
+        discount_result = await coupon_service.apply_coupon(code, subtotal)
+        if not discount_result["valid"]:
+            return {}
+        
+        coupon = discount_result["coupon"]
+        await self._supersede_pending_orders(customer_email, coupon.uid)
+        redemption = await coupon_service.redeem(coupon, customer_email, order_uid)
+        if not redemption["redeemed"]:
+            return {"error": redemption["message"]}
+        return {
+            "discount_amount": discount_result["discount_amount"],
+            "coupon_uid": coupon.uid,
+            "coupon_shard": redemption["shard"],
+            "customer_email": customer_email,
+            "uid": order_uid
+        }
+    
+    async def _supersede_pending_orders(self, customer_email: str, coupon_uid: UUID) -> None:
+        """
+        Expire the customer's unpaid online orders holding this coupon before a retry redeems it
+        Otherwise the abandoned attempt counts against per_customer_limit until the sweeper
+        runs; a payment that still lands on it is flagged by confirm_payment like any expiry
+        """
+        superseded_filter = {
+            "customer_email": customer_email,
+            "coupon_uid": coupon_uid,
+            "payment_status": PaymentStatus.PENDING.value,
+            "razorpay_order_id": {"$type": "string"}
+        }
+        docs = await self.collection.find(superseded_filter, EXPIRY_PROJECTION).to_list(length=None)
+        if not docs:
+            return
+        
+        docs = await self._expire_orders(docs)
+        await self._release_expired_holds(docs)
+        if docs:
+            logger.info(f"Superseded {len(docs)} unpaid orders for {customer_email}")
+    
+    async def _release_coupon(self, hold: Dict[str, Any]) -> None:
+        """Give back a coupon use held by an order (an order doc or a _redeem_coupon result)"""
+        if not hold.get("coupon_uid"):
+            return
+        try:
+            await CouponService(self.db).release(
+                hold["coupon_uid"], hold.get("coupon_shard"), hold["customer_email"], hold["uid"]
+            )
+        except Exception as e:
+            logger.error(f"Failed to release coupon {hold['coupon_uid']}: {e}")
+    
     async def update_order_status(self, uid: UUID, status: OrderStatus, tracking_number: Optional[str] = None) -> bool:
         """Update order status and tracking"""
         try:
-            update_data = {
-                "status": status.value,
-                "updated_at": datetime.utcnow()
-            }
+            update_data = self._status_update_fields(status, tracking_number)
             
-            if tracking_number:
-                update_data["tracking_number"] = tracking_number
+            previous_doc = await self.collection.find_one_and_update(
+                {"uid": uid},
+                {"$set": update_data},
+                projection={"uid": 1, "status": 1, "created_at": 1, "customer_email": 1,
+                            "coupon_uid": 1, "coupon_shard": 1},
+                return_document=ReturnDocument.BEFORE
+            )
             
-            if status == OrderStatus.SHIPPED:
-                update_data["shipped_at"] = datetime.utcnow()
-            elif status == OrderStatus.DELIVERED:
-                update_data["delivered_at"] = datetime.utcnow()
+            if not previous_doc:
+                return False
             
-            result = await self.collection.update_one(
-                {"uid": str(uid)},
-                {"$set": update_data}
+            await self.stats_service.record_status_change(
+                previous_doc["created_at"], previous_doc["status"], status.value
             )
-            
-            return result.modified_count > 0
+            # The pre-image makes this exactly-once even if two cancels race
+            if status == OrderStatus.CANCELLED and previous_doc["status"] != OrderStatus.CANCELLED.value:
+                await self._release_coupon(previous_doc)
+            return True
             
         except Exception as e:
             logger.error(f"Error updating order status {uid}: {e}")
             raise
     
+    async def bulk_update_order_status(self, updates: List[OrderStatusUpdate]) -> Dict[str, Any]:
+        """
+        Apply many status/tracking updates with one unordered bulk_write
+        Each row only applies if the order still has the status it was read with,
+        so coupon releases and rollup deltas happen exactly once even when another
+        update races this one; rows that lost the race are reported as conflicts
+        Returns per-row results plus the customer notifications to send as one batch
+        """
+        uids = [update.uid for update in updates]
+        current = {}
+        async for doc in self.collection.find(
+            {"uid": {"$in": uids}},
+            {"uid": 1, "order_number": 1, "status": 1, "created_at": 1, "customer_email": 1,
+             "shipping_address.full_name": 1, "coupon_uid": 1, "coupon_shard": 1}
+        ):
+            current[doc["uid"]] = doc
+        
+        now = datetime.utcnow()
+        write_id = uuid4()  # identifies this call's writes when some rows conflict
+        results: List[OrderStatusUpdateResult] = []
+        operations = []
+        pending = []  # (result index, update, previous doc) aligned with operations
+        seen = set()
+        
+        for update in updates:
+            if update.uid in seen:
+                results.append(OrderStatusUpdateResult(
+                    uid=update.uid, success=False, message="Duplicate row"
+                ))
+                continue
+            seen.add(update.uid)
+            
+            previous_doc = current.get(update.uid)
+            if not previous_doc:
+                results.append(OrderStatusUpdateResult(
+                    uid=update.uid, success=False, message="Order not found"
+                ))
+                continue
+            
+            operations.append(UpdateOne(
+                {"uid": update.uid, "status": previous_doc["status"]},
+                {
+                    "$set": self._status_update_fields(update.status, update.tracking_number, now),
+                    "$push": {"status_write_ids": {"$each": [write_id], "$slice": -STATUS_WRITE_IDS_KEPT}}
+                }
+            ))
+            pending.append((len(results), update, previous_doc))
+            results.append(OrderStatusUpdateResult(uid=update.uid, success=True, message="Updated"))
+        
+        write_errors = {}
+        matched = len(operations)
+        if operations:
+            try:
+                result = await self.collection.bulk_write(operations, ordered=False)
+                matched = result.matched_count
+            except BulkWriteError as e:
+                write_errors = {error["index"]: error.get("errmsg", "Write failed")
+                                for error in e.details.get("writeErrors", [])}
+                matched = e.details.get("nMatched", 0)
+        
+        applied = None  # None: every row without a write error matched
+        if matched < len(operations) - len(write_errors):
+            applied = set(await self.collection.distinct(
+                "uid", {"uid": {"$in": [update.uid for _, update, _ in pending]}, "status_write_ids": write_id}
+            ))
+        
+        notifications = []
+        for op_index, (result_index, update, previous_doc) in enumerate(pending):
+            if op_index in write_errors:
+                results[result_index] = OrderStatusUpdateResult(
+                    uid=update.uid, success=False, message=write_errors[op_index]
+                )
+                continue
+            if applied is not None and update.uid not in applied:
+                results[result_index] = OrderStatusUpdateResult(
+                    uid=update.uid, success=False, message="Conflict: order status changed concurrently"
+                )
+                continue
+            
+            await self.stats_service.record_status_change(
+                previous_doc["created_at"], previous_doc["status"], update.status.value
+            )
+            if (update.status == OrderStatus.CANCELLED
+                    and previous_doc["status"] != OrderStatus.CANCELLED.value):
+                await self._release_coupon(previous_doc)
+            if update.status in NOTIFY_STATUSES:
+                notifications.append({
+                    "email": previous_doc["customer_email"],
+                    "name": previous_doc.get("shipping_address", {}).get("full_name"),
+                    "order_id": previous_doc.get("order_number") or str(update.uid),
+                    "status": update.status.value,
+                    "tracking_number": update.tracking_number
+                })
+        
+        updated = sum(1 for result in results if result.success)
+        logger.info(f"Bulk status update: {updated}/{len(updates)} orders updated")
+        
+        return {
+            "updated": updated,
+            "failed": len(updates) - updated,
+            "results": results,
+            "notifications": notifications
+        }
+    
+    def _status_update_fields(
+        self,
+        status: OrderStatus,
+        tracking_number: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """$set payload for a status change, stamping shipped_at/delivered_at"""
+        now = now or datetime.utcnow()
+        update_data = {
+            "status": status.value,
+            "updated_at": now
+        }
+        
+        if tracking_number:
+            update_data["tracking_number"] = tracking_number
+        
+        if status == OrderStatus.SHIPPED:
+            update_data["shipped_at"] = now
+        elif status == OrderStatus.DELIVERED:
+            update_data["delivered_at"] = now
+        
+        return update_data
+    
     def _calculate_shipping_cost(self, subtotal: Decimal) -> Decimal:
         """Calculate shipping cost based on order value"""
         # Free shipping above ₹500
@@ -363,69 +890,225 @@ class OrderService:
             return False
 
 
-    async def get_all_orders_admin(self, skip: int = 0, limit: int = 100, status_filter: Optional[str] = None) -> List[Order]:
-        """Get all orders for admin dashboard"""
+    async def get_all_orders_admin(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> OrderPage:
+        """
+        Get orders for admin dashboard, newest first
+        Keyset pagination on (created_at, uid) so deep pages cost the same as the first
+        """
+        filter_query = _admin_filter(status_filter, payment_status, created_from, created_to)
+        if cursor:
+            filter_query.update(_keyset_after(cursor))
+        
         try:
-            filter_query = {}
-            if status_filter:
-                filter_query["status"] = status_filter
-            
-            cursor = self.collection.find(filter_query).skip(skip).limit(limit).sort("created_at", -1)
-            orders = []
-            
-            async for order_doc in cursor:
-                order_doc['uid'] = UUID(order_doc['uid'])
-                orders.append(Order(**order_doc))
-            
-            return orders
+            docs, next_cursor = await self._fetch_page(filter_query, ADMIN_ROW_PROJECTION, limit)
+            return OrderPage(
+                items=[from_document(OrderAdminRow, doc) for doc in docs],
+                next_cursor=next_cursor
+            )
         except Exception as e:
             logger.error(f"Error fetching admin orders: {e}")
-            return []
+            return OrderPage()
 
-    async def get_order_stats(self) -> Dict[str, Any]:
-        """Get order statistics for admin dashboard"""
-        try:
-            # Total orders
-            total_orders = await self.collection.count_documents({})
+    async def export_orders(
+        self,
+        export_format: str = "ndjson",
+        flatten_items: bool = False,
+        status_filter: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[str]:
+        """
+        Stream orders as NDJSON or CSV text chunks, oldest first
+        Live and archived orders are read with the same filter on two batched cursors
+        and merged on (created_at, uid) - one chunk per batch, constant memory
+        """
+        filter_query = _admin_filter(status_filter, payment_status, created_from, created_to)
+        columns = EXPORT_ORDER_COLUMNS + (EXPORT_ITEM_COLUMNS if flatten_items else [])
+        cursor = _merge_sorted(*(
+            collection.find(filter_query, {"_id": 0})
+            .sort([("created_at", 1), ("uid", 1)]).batch_size(batch_size)
+            for collection in (self.collection, self.archive_collection)
+        ), key=lambda doc: (doc["created_at"], doc["uid"]))
+        
+        buffer = io.StringIO()
+        writer = None
+        if export_format == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+        buffered = 0
+        
+        async for doc in cursor:
+            order_row = _export_order_row(doc)
+            if flatten_items:
+                rows = [{**order_row, **_export_item_row(item)} for item in doc.get("items") or []]
+            elif writer:
+                rows = [order_row]
+            else:
+                rows = [_export_value(doc)]
             
-            # Orders by status
-            status_pipeline = [
-                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-            ]
-            status_stats = {}
-            async for result in self.collection.aggregate(status_pipeline):
-                status_stats[result["_id"]] = result["count"]
-            
-            # Revenue stats
-            revenue_pipeline = [
-                {"$match": {"payment_status": "completed"}},
-                {"$group": {
-                    "_id": None,
-                    "total_revenue": {"$sum": "$total_amount"},
-                    "avg_order_value": {"$avg": "$total_amount"}
-                }}
-            ]
-            revenue_stats = {"total_revenue": 0, "avg_order_value": 0}
-            async for result in self.collection.aggregate(revenue_pipeline):
-                revenue_stats = {
-                    "total_revenue": float(result["total_revenue"]),
-                    "avg_order_value": float(result["avg_order_value"])
-                }
+            for row in rows:
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(row))
+                    buffer.write("\n")
             
-            # Recent orders count
-            from datetime import datetime, timedelta
-            recent_date = datetime.utcnow() - timedelta(days=7)
-            recent_orders = await self.collection.count_documents({
-                "created_at": {"$gte": recent_date}
-            })
+            buffered += 1
+            if buffered >= batch_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                buffered = 0
+        
+        if buffer.tell():
+            yield buffer.getvalue()
+    
+    async def _flag_late_payment(self, existing: Dict[str, Any], payment_id: str) -> Dict[str, Any]:
+        """
+        Payment captured for an order that was already expired/cancelled/failed
+        The order is not revived (its coupon use and stock hold were given back);
+        the payment id is recorded so the payment can be refunded or reviewed
+        """
+        await self.collection.update_one(
+            {"_id": existing["_id"]},
+            {"$set": {"late_payment_id": payment_id, "updated_at": datetime.utcnow()}}
+        )
+        logger.warning(
+            f"Late payment {payment_id} for order {existing['uid']} "
+            f"(payment status {existing['payment_status']}); flagged for refund"
+        )
+        return {
+            "success": False,
+            "message": "Order expired before payment completed; the payment will be refunded"
+        }
+    
+    async def expire_pending_orders(
+        self,
+        older_than_minutes: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        Expire unpaid online orders older than the cutoff, batch by batch
+        Uses the partial pending_online_orders index; the update re-checks
+        payment_status so an order paid mid-sweep is left alone
+        """
+        older_than_minutes = older_than_minutes or settings.PENDING_ORDER_EXPIRY_MINUTES
+        batch_size = batch_size or settings.PENDING_ORDER_SWEEP_BATCH_SIZE
+        cutoff = datetime.utcnow() - timedelta(minutes=older_than_minutes)
+        pending_filter = {
+            "payment_status": PaymentStatus.PENDING.value,
+            "razorpay_order_id": {"$type": "string"},
+            "created_at": {"$lt": cutoff}
+        }
+        
+        expired = 0
+        while True:
+            docs = await self.collection.find(
+                pending_filter, EXPIRY_PROJECTION
+            ).hint(PENDING_ONLINE_ORDERS_INDEX).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
             
-            return {
-                "total_orders": total_orders,
-                "status_distribution": status_stats,
-                "total_revenue": revenue_stats["total_revenue"],
-                "avg_order_value": revenue_stats["avg_order_value"],
-                "recent_orders": recent_orders
-            }
+            batch_count = len(docs)
+            docs = await self._expire_orders(docs)
+            await self._release_expired_holds(docs)
+            expired += len(docs)
+            
+            if batch_count < batch_size:
+                break
+        
+        if expired:
+            logger.info(f"Expired {expired} unpaid orders")
+        return expired
+    
+    async def _expire_orders(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Mark unpaid orders expired and cancelled, re-checking payment_status
+        Returns only the docs this call expired; any paid in the meantime are left alone
+        """
+        now = datetime.utcnow()
+        ids = [doc["_id"] for doc in docs]
+        result = await self.collection.update_many(
+            {"_id": {"$in": ids}, "payment_status": PaymentStatus.PENDING.value},
+            {"$set": {
+                "payment_status": PaymentStatus.EXPIRED.value,
+                "status": OrderStatus.CANCELLED.value,
+                "expired_at": now,
+                "updated_at": now
+            }}
+        )
+        
+        if result.modified_count < len(docs):
+            # Some were paid between find and update - release only what we expired
+            swept_ids = set(await self.collection.distinct(
+                "_id", {"_id": {"$in": ids}, "expired_at": now}
+            ))
+            docs = [doc for doc in docs if doc["_id"] in swept_ids]
+        return docs
+    
+    async def _release_expired_holds(self, docs: List[Dict[str, Any]]) -> None:
+        """Undo everything an expired order was holding"""
+        for doc in docs:
+            await self.stats_service.record_status_change(
+                doc["created_at"], doc["status"], OrderStatus.CANCELLED.value
+            )
+            await self._release_coupon(doc)
+    
+    async def archive_orders(
+        self,
+        older_than_days: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        Move terminal orders older than the cutoff into orders_archive, batch by batch
+        Copy-then-delete keyed on _id, so a crashed run can simply be repeated
+        """
+        older_than_days = older_than_days or settings.ORDER_ARCHIVE_AFTER_DAYS
+        batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        archive_filter = {
+            "status": {"$in": [status.value for status in ARCHIVABLE_STATUSES]},
+            "created_at": {"$lt": cutoff}
+        }
+        
+        archived = 0
+        while True:
+            docs = await self.collection.find(archive_filter).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
+            
+            try:
+                await self.archive_collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # Duplicates are leftovers of an interrupted run; anything else is fatal
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+            
+            await self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            archived += len(docs)
+            logger.info(f"Archived {archived} orders so far")
+        
+        logger.info(f"Order archival complete: {archived} orders moved")
+        return archived
+    
+    async def get_order_stats(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Get order statistics for admin dashboard from the daily rollups"""
+        try:
+            return await self.stats_service.get_stats(start_date, end_date)
             
         except Exception as e:
             logger.error(f"Error fetching order stats: {e}")
@@ -438,5 +1121,16 @@ class OrderService:
             }
 
 
+async def run_pending_order_sweeper(db: AsyncIOMotorDatabase) -> None:
+    """Background loop expiring unpaid orders every PENDING_ORDER_SWEEP_INTERVAL_SECONDS"""
+    order_service = OrderService(db)
+    while True:
+        await asyncio.sleep(settings.PENDING_ORDER_SWEEP_INTERVAL_SECONDS)
+        try:
+            await order_service.expire_pending_orders()
+        except Exception as e:
+            logger.error(f"Pending order sweep failed: {e}")
+
+
 # Import here to avoid circular imports
 from services.coupon_service import CouponService
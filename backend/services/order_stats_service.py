@@ -0,0 +1,153 @@
+# Dbanyan Group Backend - Order Statistics Rollups
+# Daily rollup documents maintained incrementally as orders change state
+# Keeps the admin dashboard O(days) instead of O(orders)
+
+import logging
+from typing import Dict, Any, Optional
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from models import PaymentStatus
+from codec import decode_value
+
+logger = logging.getLogger(__name__)
+
+
+def day_key(created_at: Any) -> str:
+    """Rollup bucket (UTC day) for an order's created_at - datetime or ISO string"""
+    if isinstance(created_at, (datetime, date)):
+        return created_at.strftime("%Y-%m-%d")
+    return str(created_at)[:10]
+
+
+def to_paise(amount: Any) -> int:
+    """Money as integer paise so rollups can be $inc'ed exactly"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1")))
+
+
+class OrderStatsService:
+    """Daily order rollups: counts by status, paid order count and revenue (paise)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.order_stats_daily
+
+    async def _increment(self, created_at: Any, increments: Dict[str, int]) -> None:
+        """Apply counter deltas to the order's day bucket; rollup drift is repaired by rebuild()"""
+        try:
+            day = day_key(created_at)
+            await self.collection.update_one(
+                {"_id": day},
+                {
+                    "$inc": increments,
+                    "$set": {"updated_at": datetime.utcnow()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error updating order stats rollup: {e}")
+
+    async def record_order_created(self, created_at: Any, status: str) -> None:
+        """Count a newly placed order"""
+        await self._increment(created_at, {"orders": 1, f"status.{status}": 1})
+
+    async def record_status_change(self, created_at: Any, old_status: str, new_status: str) -> None:
+        """Move an order between status buckets"""
+        if old_status == new_status:
+            return
+        await self._increment(created_at, {f"status.{old_status}": -1, f"status.{new_status}": 1})
+
+    async def record_payment(self, created_at: Any, total_amount: Any) -> None:
+        """Count a completed payment towards revenue"""
+        await self._increment(created_at, {"paid_orders": 1, "revenue_paise": to_paise(total_amount)})
+
+    async def get_stats(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Aggregate rollups over an inclusive date range (all time by default)"""
+        day_filter = {}
+        if start_date:
+            day_filter["$gte"] = day_key(start_date)
+        if end_date:
+            day_filter["$lte"] = day_key(end_date)
+        query_filter = {"_id": day_filter} if day_filter else {}
+
+        recent_from = day_key(datetime.utcnow() - timedelta(days=7))
+        total_orders = 0
+        paid_orders = 0
+        revenue_paise = 0
+        recent_orders = 0
+        status_stats: Dict[str, int] = {}
+
+        async for doc in self.collection.find(query_filter):
+            total_orders += doc.get("orders", 0)
+            paid_orders += doc.get("paid_orders", 0)
+            revenue_paise += doc.get("revenue_paise", 0)
+            if doc["_id"] >= recent_from:
+                recent_orders += doc.get("orders", 0)
+            for status, count in doc.get("status", {}).items():
+                status_stats[status] = status_stats.get(status, 0) + count
+
+        total_revenue = revenue_paise / 100
+        return {
+            "total_orders": total_orders,
+            "status_distribution": {k: v for k, v in status_stats.items() if v},
+            "total_revenue": total_revenue,
+            "avg_order_value": total_revenue / paid_orders if paid_orders else 0,
+            "recent_orders": recent_orders,
+            "start_date": day_filter.get("$gte"),
+            "end_date": day_filter.get("$lte")
+        }
+
+    async def rebuild(self) -> int:
+        """
+        Recompute every daily rollup from live and archived orders
+        Run during low traffic: increments landing mid-rebuild may be overwritten
+        """
+        pipeline = [
+            {"$unionWith": "orders_archive"},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "status": "$status"
+                },
+                "orders": {"$sum": 1},
+                "paid_orders": {"$sum": {
+                    "$cond": [{"$eq": ["$payment_status", PaymentStatus.COMPLETED.value]}, 1, 0]
+                }},
+                "revenue": {"$sum": {
+                    "$cond": [
+                        {"$eq": ["$payment_status", PaymentStatus.COMPLETED.value]},
+                        "$total_amount",
+                        0
+                    ]
+                }}
+            }}
+        ]
+
+        days: Dict[str, Dict[str, Any]] = {}
+        async for row in self.db.orders.aggregate(pipeline, allowDiskUse=True):
+            day = row["_id"]["day"]
+            bucket = days.setdefault(day, {
+                "_id": day, "orders": 0, "paid_orders": 0, "revenue_paise": 0, "status": {}
+            })
+            bucket["orders"] += row["orders"]
+            bucket["paid_orders"] += row["paid_orders"]
+            bucket["revenue_paise"] += to_paise(decode_value(row["revenue"]))
+            bucket["status"][row["_id"]["status"]] = row["orders"]
+
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne({"_id": day}, {**doc, "updated_at": now}, upsert=True)
+            for day, doc in days.items()
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        await self.collection.delete_many({"_id": {"$nin": list(days.keys())}})
+
+        logger.info(f"Order stats rebuilt for {len(days)} days")
+        return len(days)
@@ -13,6 +13,8 @@ from models import (
     Product, ProductCreate, ProductUpdate, ProductCategory,
     ResponseModel, PaginatedResponse
 )
+from codec import to_document, from_document, encode_value
+from services.promotion_engine import promotion_engine
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +33,10 @@ class ProductService:
             product = Product(**product_data.model_dump())
             
             # Insert into database
-            result = await self.collection.insert_one(
-                product.model_dump(mode='json')
-            )
+            result = await self.collection.insert_one(to_document(product))
             
             if result.inserted_id:
+                promotion_engine.invalidate()  # category-scoped promotions need the new product
                 logger.info(f"Product created: {product.uid}")
                 return product
             else:
@@ -48,11 +49,9 @@ class ProductService:
     async def get_product_by_uid(self, uid: UUID) -> Optional[Product]:
         """Get product by UID"""
         try:
-            product_doc = await self.collection.find_one({"uid": str(uid)})
+            product_doc = await self.collection.find_one({"uid": uid})
             if product_doc:
-                # Convert string UID back to UUID for Pydantic
-                product_doc['uid'] = UUID(product_doc['uid'])
-                return Product(**product_doc)
+                return from_document(Product, product_doc)
             return None
             
         except Exception as e:
@@ -88,8 +87,7 @@ class ProductService:
             # Convert to Pydantic models
             products = []
             for doc in products_docs:
-                doc['uid'] = UUID(doc['uid'])
-                products.append(Product(**doc))
+                products.append(from_document(Product, doc))
             
             # Calculate pages
             pages = (total + per_page - 1) // per_page
@@ -117,11 +115,13 @@ class ProductService:
             
             # Update in database
             result = await self.collection.update_one(
-                {"uid": str(uid)},
-                {"$set": update_dict}
+                {"uid": uid},
+                {"$set": encode_value(update_dict)}
             )
             
             if result.modified_count > 0:
+                if "category" in update_dict:
+                    promotion_engine.invalidate()  # recategorized: reload the product -> category map
                 # Return updated product
                 return await self.get_product_by_uid(uid)
             return None
@@ -134,7 +134,7 @@ class ProductService:
         """Soft delete product (set is_active to False)"""
         try:
             result = await self.collection.update_one(
-                {"uid": str(uid)},
+                {"uid": uid},
                 {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
             )
             return result.modified_count > 0
@@ -147,7 +147,7 @@ class ProductService:
         """Update product inventory quantity - FR3.4"""
         try:
             result = await self.collection.update_one(
-                {"uid": str(uid)},
+                {"uid": uid},
                 {"$set": {"quantity": new_quantity, "updated_at": datetime.utcnow()}}
             )
             return result.modified_count > 0
@@ -170,7 +170,7 @@ class ProductService:
                         quantity_to_decrement = item["quantity"]
                         
                         # Check current quantity first - FR3.3
-                        product = await self.get_product_by_uid(UUID(product_uid))
+                        product = await self.get_product_by_uid(product_uid)
                         if not product or product.quantity < quantity_to_decrement:
                             await session.abort_transaction()
                             logger.error(f"Insufficient stock for product {product_uid}")
@@ -178,7 +178,7 @@ class ProductService:
                         
                         # Decrement quantity
                         result = await self.collection.update_one(
-                            {"uid": str(product_uid)},
+                            {"uid": product_uid},
                             {
                                 "$inc": {"quantity": -quantity_to_decrement},
                                 "$set": {"updated_at": datetime.utcnow()}
@@ -212,7 +212,7 @@ class ProductService:
                 product_uid = item["product_uid"]
                 requested_quantity = item["quantity"]
                 
-                product = await self.get_product_by_uid(UUID(product_uid))
+                product = await self.get_product_by_uid(product_uid)
                 if not product:
                     availability["available"] = False
                     availability["issues"].append({
@@ -264,10 +264,9 @@ class ProductService:
             # Convert to Pydantic models
             products = []
             for doc in products_docs:
-                doc['uid'] = UUID(doc['uid'])
                 # Remove the score field for Pydantic
                 doc.pop('score', None)
-                products.append(Product(**doc))
+                products.append(from_document(Product, doc))
             
             # Calculate pages
             pages = (total + per_page - 1) // per_page
@@ -297,8 +296,7 @@ class ProductService:
             
             products = []
             for doc in products_docs:
-                doc['uid'] = UUID(doc['uid'])
-                products.append(Product(**doc))
+                products.append(from_document(Product, doc))
             
             return products
             
@@ -0,0 +1,256 @@
+# Dbanyan Group Backend - Promotion Engine
+# Promotion rules are stored as data and compiled once, on load, into evaluator
+# closures ordered by priority. Evaluating a cart is then pure Python over a
+# handful of lines - no database access - so it can run on every cart change
+# Per worker process: writes invalidate locally, other workers reload within the refresh interval
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from uuid import UUID
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from codec import from_document
+from config import settings
+from models import (
+    AppliedPromotion, CouponType, OrderItem, Promotion, PromotionKind, StackingPolicy
+)
+from services.coupon_cache import normalize_code
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+class CartLine(NamedTuple):
+    """Order item plus the product category the rules scope on"""
+    product_uid: UUID
+    category: Optional[str]
+    quantity: int
+    unit_price: Decimal
+    total: Decimal
+
+
+class CompiledPromotion(NamedTuple):
+    uid: UUID
+    name: str
+    priority: int
+    stacking: StackingPolicy
+    auto_apply: bool
+    code: Optional[str]
+    starts_at: Optional[datetime]
+    expires_at: Optional[datetime]
+    evaluate: Callable[[List[CartLine], Decimal], Decimal]
+
+
+def _scope(promotion: Promotion) -> Callable[[CartLine], bool]:
+    """Line predicate for the promotion's categories/products (empty: every line)"""
+    categories = {category.value for category in promotion.categories}
+    products = set(promotion.product_uids)
+    if not categories and not products:
+        return lambda line: True
+    return lambda line: line.category in categories or line.product_uid in products
+
+
+def _off(value_type: CouponType, value: Decimal) -> Callable[[Decimal], Decimal]:
+    """Discount on an amount: percentage of it, or a fixed sum never exceeding it"""
+    if value_type == CouponType.PERCENTAGE:
+        rate = value / Decimal('100')
+        return lambda amount: amount * rate
+    return lambda amount: min(value, amount)
+
+
+def compile_promotion(promotion: Promotion) -> CompiledPromotion:
+    """Turn a stored rule into an evaluator closure; raises ValueError for incomplete rules"""
+    in_scope = _scope(promotion)
+
+    if promotion.kind == PromotionKind.DISCOUNT:
+        if promotion.value is None:
+            raise ValueError("Discount promotions need a value")
+        off = _off(promotion.value_type, promotion.value)
+
+        def compute(lines: List[CartLine]) -> Decimal:
+            scoped = sum((line.total for line in lines if in_scope(line)), ZERO)
+            return off(scoped) if scoped else ZERO
+
+    elif promotion.kind == PromotionKind.BUY_X_GET_Y:
+        if not promotion.buy_quantity or not promotion.get_quantity:
+            raise ValueError("Buy X get Y promotions need buy_quantity and get_quantity")
+        group = promotion.buy_quantity + promotion.get_quantity
+        get_quantity = promotion.get_quantity
+        off = _off(promotion.value_type, promotion.value or Decimal('100'))
+
+        def compute(lines: List[CartLine]) -> Decimal:
+            # The cheapest units in scope are the "get" units
+            scoped = sorted((line for line in lines if in_scope(line)), key=lambda line: line.unit_price)
+            free = sum(line.quantity for line in scoped) // group * get_quantity
+            discount = ZERO
+            for line in scoped:
+                if not free:
+                    break
+                units = min(free, line.quantity)
+                discount += off(line.unit_price) * units
+                free -= units
+            return discount
+
+    elif promotion.kind == PromotionKind.TIERED:
+        if not promotion.tiers:
+            raise ValueError("Tiered promotions need at least one tier")
+        tiers = [
+            (tier.min_amount, _off(promotion.value_type, tier.value))
+            for tier in sorted(promotion.tiers, key=lambda tier: tier.min_amount, reverse=True)
+        ]
+
+        def compute(lines: List[CartLine]) -> Decimal:
+            scoped = sum((line.total for line in lines if in_scope(line)), ZERO)
+            if scoped:
+                for min_amount, off in tiers:
+                    if scoped >= min_amount:
+                        return off(scoped)
+            return ZERO
+
+    else:
+        raise ValueError(f"Unknown promotion kind: {promotion.kind}")
+
+    minimum = promotion.minimum_order_amount
+    cap = promotion.maximum_discount_amount
+
+    def evaluate(lines: List[CartLine], subtotal: Decimal) -> Decimal:
+        if subtotal < minimum:
+            return ZERO
+        discount = compute(lines)
+        if cap is not None and discount > cap:
+            discount = cap
+        return discount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    if not promotion.auto_apply and not promotion.code:
+        raise ValueError("Promotions that are not auto-applied need a code")
+
+    return CompiledPromotion(
+        uid=promotion.uid,
+        name=promotion.name,
+        priority=promotion.priority,
+        stacking=promotion.stacking,
+        auto_apply=promotion.auto_apply,
+        code=normalize_code(promotion.code) if promotion.code else None,
+        starts_at=promotion.starts_at,
+        expires_at=promotion.expires_at,
+        evaluate=evaluate
+    )
+
+
+class PromotionEngine:
+    """Holds the compiled active promotions and the product -> category map"""
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._promotions: List[CompiledPromotion] = []
+        self._categories: Dict[UUID, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    def invalidate(self) -> None:
+        """
+        Force a reload on next use; called by promotion writes and by product
+        create/recategorize (other workers catch up within refresh_seconds)
+        """
+        self._loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncIOMotorDatabase) -> None:
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                await self._load(db)
+
+    async def _load(self, db: AsyncIOMotorDatabase) -> None:
+        now = datetime.utcnow()
+        compiled = []
+        async for doc in db.promotions.find({
+            "is_active": True,
+            "$or": [{"expires_at": None}, {"expires_at": {"$gt": now}}]
+        }).sort("created_at", 1):
+            try:
+                compiled.append(compile_promotion(from_document(Promotion, doc)))
+            except ValueError as e:
+                logger.error(f"Skipping promotion {doc.get('uid')}: {e}")
+        compiled.sort(key=lambda promotion: -promotion.priority)  # stable: ties keep creation order
+
+        categories = {
+            doc["uid"]: doc.get("category")
+            async for doc in db.products.find({}, {"_id": 0, "uid": 1, "category": 1})
+        }
+
+        self._promotions = compiled
+        self._categories = categories
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(compiled)} active promotions")
+
+    def evaluate(self, items: List[OrderItem], code: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Best promotion discount for a cart
+        Stackable promotions add up (a STOP promotion ends evaluation after itself);
+        the best EXCLUSIVE promotion replaces the stack if it is worth more
+        """
+        lines = [
+            CartLine(item.product_uid, self._categories.get(item.product_uid),
+                     item.quantity, item.unit_price, item.total_price)
+            for item in items
+        ]
+        subtotal = sum((line.total for line in lines), ZERO)
+        code = normalize_code(code) if code else None
+        now = datetime.utcnow()
+
+        stack = []
+        exclusive = None
+        for promotion in self._promotions:
+            if promotion.starts_at and now < promotion.starts_at:
+                continue
+            if promotion.expires_at and now >= promotion.expires_at:
+                continue
+            if not promotion.auto_apply and promotion.code != code:
+                continue
+
+            amount = promotion.evaluate(lines, subtotal)
+            if amount <= 0:
+                continue
+            if promotion.stacking == StackingPolicy.EXCLUSIVE:
+                if exclusive is None or amount > exclusive[1]:
+                    exclusive = (promotion, amount)
+                continue
+            stack.append((promotion, amount))
+            if promotion.stacking == StackingPolicy.STOP:
+                break
+
+        chosen = stack
+        if exclusive and exclusive[1] >= sum((amount for _, amount in stack), ZERO):
+            chosen = [exclusive]
+
+        applied = []
+        remaining = subtotal
+        for promotion, amount in chosen:
+            amount = min(amount, remaining)  # never discount below zero
+            if amount <= 0:
+                break
+            remaining -= amount
+            applied.append(AppliedPromotion(uid=promotion.uid, name=promotion.name, discount_amount=amount))
+
+        return {
+            "discount_amount": subtotal - remaining,
+            "applied": applied,
+            "code_applied": code is not None and any(
+                promotion.code == code for promotion, _ in chosen
+            )
+        }
+
+
+# Global promotion engine instance
+promotion_engine = PromotionEngine(settings.PROMOTIONS_REFRESH_SECONDS)
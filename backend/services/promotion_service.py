@@ -0,0 +1,70 @@
+# Dbanyan Group Backend - Promotion Service
+# CRUD for promotion rules; evaluation lives in the promotion engine
+
+import logging
+from typing import List
+from uuid import UUID
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from models import Promotion, PromotionCreate
+from codec import to_document, from_document
+from services.coupon_cache import normalize_code
+from services.promotion_engine import compile_promotion, promotion_engine
+
+logger = logging.getLogger(__name__)
+
+
+class PromotionService:
+    """Business logic for promotion management"""
+    
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.collection = db.promotions
+    
+    async def create_promotion(self, promotion_data: PromotionCreate) -> Promotion:
+        """Create a promotion; raises ValueError if the rule cannot be compiled"""
+        try:
+            data = promotion_data.model_dump()
+            if data["code"]:
+                data["code"] = normalize_code(data["code"])
+            promotion = Promotion(**data)
+            compile_promotion(promotion)  # reject incomplete rules up front
+            
+            await self.collection.insert_one(to_document(promotion))
+            promotion_engine.invalidate()
+            
+            logger.info(f"Promotion created: {promotion.name}")
+            return promotion
+            
+        except Exception as e:
+            logger.error(f"Error creating promotion: {e}")
+            raise
+    
+    async def get_active_promotions(self) -> List[Promotion]:
+        """Active promotions, highest priority first"""
+        try:
+            promotions = []
+            async for doc in self.collection.find({"is_active": True}).sort(
+                [("priority", -1), ("created_at", 1)]
+            ):
+                promotions.append(from_document(Promotion, doc))
+            return promotions
+            
+        except Exception as e:
+            logger.error(f"Error fetching promotions: {e}")
+            raise
+    
+    async def deactivate_promotion(self, uid: UUID) -> bool:
+        """Deactivate a promotion"""
+        try:
+            result = await self.collection.update_one(
+                {"uid": uid, "is_active": True},
+                {"$set": {"is_active": False}}
+            )
+            if result.modified_count:
+                promotion_engine.invalidate()
+            return result.modified_count > 0
+            
+        except Exception as e:
+            logger.error(f"Error deactivating promotion {uid}: {e}")
+            raise